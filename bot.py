@@ -7,7 +7,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from services.db import Database
+from services.card_updates import CardUpdater
+from services.db import ARCHIVE_AFTER_DAYS, BOND_AUTO_REDEEM, Database
 from cogs.jobs import JobsCog, JobWorkflowView
 from cogs.account import AccountCog, CashoutPersistentView
 from cogs.treasury import TreasuryCog
@@ -18,6 +19,8 @@ from cogs.stock import StockCog
 
 TOKEN = os.getenv("DISCORD_TOKEN")
 GUILD_ID = int(os.getenv("GUILD_ID", "0") or "0")
+ARCHIVE_INTERVAL_HOURS = max(1, int(os.getenv("ARCHIVE_INTERVAL_HOURS", "24") or "24"))
+BOND_REDEEM_INTERVAL_MINUTES = max(1, int(os.getenv("BOND_REDEEM_INTERVAL_MINUTES", "15") or "15"))
 
 intents = discord.Intents.default()
 intents.guilds = True
@@ -25,10 +28,28 @@ intents.members = True
 if hasattr(intents, "guild_scheduled_events"):
     intents.guild_scheduled_events = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+class OrgBot(commands.Bot):
+    def __init__(self, *args, db: Database, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.db = db  # ✅ so cogs can access bot.db if they use that pattern
+        self.card_updates = CardUpdater(self)  # coalesced job card edits
+
+    async def close(self):
+        # Commit grouped writes before the event loop goes away.
+        if self.db.conn is not None:
+            jobs_cog = self.get_cog("JobsCog")
+            if jobs_cog is not None:
+                await jobs_cog.rsvps.close()
+            await self.card_updates.close()
+            await self.db.trades.close()
+            await self.db.market.close()
+            await self.db.flush()
+        await super().close()
+
 
 db = Database()
-bot.db = db  # ✅ so cogs can access bot.db if they use that pattern
+bot = OrgBot(command_prefix="!", intents=intents, db=db)
 
 
 @bot.event
@@ -38,6 +59,30 @@ async def on_connect():
         print("Database connected (bot.db created/ready).")
 
 
+async def _archive_loop():
+    # Move cold transactions/ledger/price rows out of the hot tables once per interval.
+    while True:
+        try:
+            moved = await db.archive_cold_rows()
+            if any(moved.values()):
+                print(f"Archived cold rows: {moved}")
+        except Exception as e:
+            print(f"Archive pass failed: {e}")
+        await asyncio.sleep(ARCHIVE_INTERVAL_HOURS * 3600)
+
+
+async def _bond_redeem_loop():
+    # Treasury increases redeem bonds right away; this sweep catches anything funded some other way.
+    while True:
+        try:
+            redeemed = await db.redeem_pending_bonds_all_guilds()
+            for gid, result in redeemed.items():
+                print(f"Auto-redeemed {result['redeemed_count']} bond(s) for {result['paid_total']:,} aUEC in guild {gid}.")
+        except Exception as e:
+            print(f"Bond auto-redeem pass failed: {e}")
+        await asyncio.sleep(BOND_REDEEM_INTERVAL_MINUTES * 60)
+
+
 @bot.event
 async def on_ready():
     print(f"Logged in as {bot.user} (ID: {bot.user.id})")
@@ -53,6 +98,14 @@ async def on_ready():
         bot.job_workflow_registered = True  # type: ignore
         print("Registered JobWorkflowView.")
 
+    if ARCHIVE_AFTER_DAYS > 0 and not hasattr(bot, "archive_task"):
+        bot.archive_task = asyncio.create_task(_archive_loop())  # type: ignore
+        print(f"Started cold archive loop (rows older than {ARCHIVE_AFTER_DAYS} days).")
+
+    if BOND_AUTO_REDEEM and not hasattr(bot, "bond_redeem_task"):
+        bot.bond_redeem_task = asyncio.create_task(_bond_redeem_loop())  # type: ignore
+        print(f"Started bond auto-redeem loop (every {BOND_REDEEM_INTERVAL_MINUTES} min).")
+
     # Multi-guild: sync app commands into every connected guild for immediate availability.
     guild_ids = [int(g.id) for g in bot.guilds]
     if guild_ids:
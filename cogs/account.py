@@ -399,28 +399,17 @@ class AccountCog(commands.Cog):
     # =======================
     @account.command(name="overview", description="View your Org Credits, Stocks, Reputation, Level, and Tier")
     async def overview(self, ctx: discord.ApplicationContext):
-        bal = await self.db.get_balance(ctx.author.id, guild_id=(ctx.guild.id if ctx.guild else None))
-        shares_total = await self.db.get_shares(ctx.author.id, guild_id=(ctx.guild.id if ctx.guild else None))
-        shares_locked = await self.db.get_shares_locked(ctx.author.id, guild_id=(ctx.guild.id if ctx.guild else None))
-        shares_available = await self.db.get_shares_available(ctx.author.id, guild_id=(ctx.guild.id if ctx.guild else None))
-        rep = await self.db.get_rep(ctx.author.id, guild_id=(ctx.guild.id if ctx.guild else None))
-        level = await self.db.get_level(ctx.author.id, per_level=LEVEL_PER_REP, guild_id=(ctx.guild.id if ctx.guild else None))
         gid = (ctx.guild.id if ctx.guild else None)
-        pending_bonds_count, pending_bonds_total = await self.db.get_user_outstanding_bonds(
-            ctx.author.id,
-            guild_id=gid,
-        )
-        pending_sells = await self.db.count_user_cashout_requests(
-            user_id=ctx.author.id,
-            statuses=["pending", "approved"],
-            guild_id=gid,
-        )
-        stock_state = await self.db.get_stock_price_state(guild_id=gid)
-        live_price = int(stock_state.get("current_price") or 0)
-        if live_price <= 0:
-            cfg = await self.db.get_stock_market_config(guild_id=gid)
-            live_price = int(cfg.get("base_price") or 100000)
-        estimated_stock_value = int(shares_total) * int(live_price)
+        snap = await self.db.get_account_snapshot(ctx.author.id, guild_id=gid, per_level=LEVEL_PER_REP)
+        bal = snap.balance
+        shares_total = snap.shares
+        shares_locked = snap.shares_locked
+        shares_available = snap.shares_available
+        rep = snap.rep
+        level = snap.level
+        pending_bonds_count, pending_bonds_total = snap.pending_bonds_count, snap.pending_bonds_total
+        pending_sells = snap.pending_sells
+        estimated_stock_value = snap.estimated_stock_value
 
         tier_text = _tier_display_for_level(int(level))
         expected_role_id = _expected_tier_role_id(int(level))
@@ -629,29 +618,28 @@ class AccountCog(commands.Cog):
 
         target_id = member.id if member else None
 
-        data = await self.db.reconcile_escrow(
+        async with self.db.reconcile_escrow_session(
             discord_id=target_id,
             dry_run=bool(dry_run),
             force_clear_active=bool(force_clear_active),
             handled_by=ctx.author.id,
             guild_id=(ctx.guild.id if ctx.guild else None),
-        )
-
-        results = data.get("users", [])
-        rejected_requests = data.get("requests_rejected", [])
-
-        changed = [r for r in results if r.get("changed")]
-        total_scanned = len(results)
-        total_changed = len(changed)
-
-        lines = []
-        for r in changed[:20]:
-            uid = r["discord_id"]
-            before = r["locked_before"]
-            after = r["locked_after"]
-            total = r["total_shares"]
-            expected = r["expected_locked"]
-            lines.append(f"<@{uid}> — locked `{before}` → `{after}` (expected `{expected}`, total `{total}`)")
+        ) as run:
+            rejected_requests = run.requests_rejected
+            total_scanned = run.scanned
+            total_changed = run.changed
+
+            # Only the first page of changes is shown; the rest stay in the temp table.
+            lines = []
+            async for page in run.pages(changed_only=True, page_size=20):
+                for r in page:
+                    uid = r["discord_id"]
+                    before = r["locked_before"]
+                    after = r["locked_after"]
+                    total = r["total_shares"]
+                    expected = r["expected_locked"]
+                    lines.append(f"<@{uid}> — locked `{before}` → `{after}` (expected `{expected}`, total `{total}`)")
+                break
 
         extra = ""
         if total_changed > 20:
@@ -211,7 +211,13 @@ class FinanceCog(commands.Cog):
 
     @finance.command(name="user_audit", description="Audit a user's recent transactions")
     @finance_or_admin()
-    async def user_audit(self, ctx: discord.ApplicationContext, member: discord.Member, limit: int = 15):
+    async def user_audit(
+        self,
+        ctx: discord.ApplicationContext,
+        member: discord.Member,
+        limit: int = 15,
+        include_archive: bool = False,
+    ):
         await ctx.defer(ephemeral=True)
 
         rows = await self.db.list_transactions(
@@ -219,6 +225,7 @@ class FinanceCog(commands.Cog):
             limit=int(limit),
             discord_id=int(member.id),
             guild_id=(ctx.guild.id if ctx.guild else None),
+            include_archive=bool(include_archive),
         )
 
         embed = discord.Embed(
@@ -311,7 +318,7 @@ class FinanceCog(commands.Cog):
         embed.add_field(name="7d Trend", value=f"`{fmt_bps(change_7d_bps)}`", inline=True)
         embed.add_field(name="Total Stocks", value=f"`{int(total_stocks):,}`", inline=True)
         embed.add_field(name="Stock Notional Value", value=f"`{int(notional_stock_value):,} aUEC`", inline=True)
-        embed.add_field(name="Net Flow (since reset)", value=f"`{int(metrics.get('net_units_24h') or 0):,}` units", inline=True)
+        embed.add_field(name="Net Flow (24h)", value=f"`{int(metrics.get('net_units_24h') or 0):,}` units", inline=True)
         embed.add_field(name="Treasury", value=f"`{int(treasury):,} aUEC`", inline=True)
         embed.add_field(name="Outstanding Bonds", value=f"`{int(outstanding_bonds):,} aUEC`", inline=True)
         embed.add_field(name="Net Available", value=f"`{int(net_available):,} aUEC`", inline=True)
@@ -345,6 +352,46 @@ class FinanceCog(commands.Cog):
         await ctx.followup.send(embed=embed, files=_logo_files(), ephemeral=True)
 
 
+    @finance.command(name="bond_liability", description="Verify (and optionally rebuild) outstanding bond counters")
+    @finance_or_admin()
+    async def bond_liability(
+        self,
+        ctx: discord.ApplicationContext,
+        repair: discord.Option(bool, description="Rebuild the counters if they differ", default=False),
+    ):
+        await ctx.defer(ephemeral=True)
+
+        gid = ctx.guild.id if ctx.guild else None
+        result = await self.db.verify_bond_liability(guild_id=gid, repair=bool(repair))
+        count, total = await self.db.get_bond_liability(guild_id=gid)
+        user_mismatches = result["user_mismatches"]
+        ok = not result["guild_mismatches"] and not user_mismatches
+
+        embed = discord.Embed(
+            title="🧾 Bond Liability Check",
+            colour=(discord.Colour.green() if ok or result["repaired"] else discord.Colour.orange()),
+        )
+        embed.set_thumbnail(url="attachment://org_logo.png")
+        embed.add_field(name="Pending Bonds", value=f"`{int(count):,}`", inline=True)
+        embed.add_field(name="Outstanding", value=f"`{int(total):,} aUEC`", inline=True)
+        embed.add_field(name="Member Mismatches", value=f"`{len(user_mismatches)}`", inline=True)
+        if user_mismatches:
+            lines = [
+                f"<@{uid}> stored `{stored[1]:,}` ({stored[0]}) vs actual `{actual[1]:,}` ({actual[0]})"
+                for (_, uid), stored, actual in user_mismatches[:10]
+            ]
+            embed.add_field(name="Differences", value="\n".join(lines)[:1024], inline=False)
+
+        if ok:
+            embed.set_footer(text="Counters match payout_bonds.")
+        elif result["repaired"]:
+            embed.set_footer(text="Counters were rebuilt from payout_bonds.")
+        else:
+            embed.set_footer(text="Run again with repair:true to rebuild the counters.")
+
+        await ctx.followup.send(embed=embed, files=_logo_files(), ephemeral=True)
+
+
 def setup(bot: commands.Bot):
     db: Database = bot.db  # type: ignore
     bot.add_cog(FinanceCog(bot, db))
@@ -1,3 +1,6 @@
+import asyncio
+import hashlib
+import json
 import os
 import re
 import logging
@@ -5,8 +8,11 @@ from datetime import timedelta
 import discord
 from discord.ext import commands
 
+from services.card_updates import CardUpdater
 from services.db import Database
+from services.guild_config import parse_job_category_channel_map as _parse_job_category_channel_map
 from services.permissions import is_admin_member, is_finance, is_jobs_admin
+from services.rsvp import RsvpAggregator
 from services.tiers import (
     JOB_TIERS,
     LEVEL_ROLE_MAP,
@@ -22,20 +28,8 @@ LEVEL_PER_REP = int(os.getenv("LEVEL_PER_REP", "100") or "100")
 JOBS_CHANNEL_ID = int(os.getenv("JOBS_CHANNEL_ID", "0") or "0")
 EVENT_HANDLER_ROLE_ID = int(os.getenv("EVENT_HANDLER_ROLE_ID", "0") or "0")
 JOB_CATEGORY_CHANNEL_MAP_RAW = os.getenv("JOB_CATEGORY_CHANNEL_MAP", "")
-
-
-def _parse_job_category_channel_map(raw: str) -> dict[str, int]:
-    out: dict[str, int] = {}
-    for part in (raw or "").split(","):
-        part = part.strip()
-        if not part or ":" not in part:
-            continue
-        k, v = part.split(":", 1)
-        k = k.strip().lower()
-        v = v.strip()
-        if k and v.isdigit():
-            out[k] = int(v)
-    return out
+# Event card edits in flight at once per guild during the startup refresh.
+STARTUP_CARD_REFRESH_CONCURRENCY = max(1, int(os.getenv("STARTUP_CARD_REFRESH_CONCURRENCY", "4") or "4"))
 
 
 JOB_CATEGORY_CHANNEL_MAP = _parse_job_category_channel_map(JOB_CATEGORY_CHANNEL_MAP_RAW)
@@ -267,6 +261,131 @@ async def _sync_member_tier_roles(
     }
 
 
+# jobs.min_level is NULL for cards posted before it was stored; those are read off the embed once.
+_JOB_MIN_LEVELS: dict[int, int] = {}
+
+
+def _card_updates(bot) -> CardUpdater:
+    updater = getattr(bot, "card_updates", None)
+    if updater is None:
+        updater = CardUpdater(bot)
+        bot.card_updates = updater
+    return updater
+
+
+async def _job_card_min_level(bot, db: Database, job_id: int, channel_id: int, message_id: int) -> int:
+    if int(job_id) in _JOB_MIN_LEVELS:
+        return _JOB_MIN_LEVELS[int(job_id)]
+    min_level = await db.get_job_min_level(int(job_id))
+    if min_level is None:
+        try:
+            msg = await bot.get_partial_messageable(int(channel_id)).fetch_message(int(message_id))
+        except Exception:
+            logger.debug("Failed reading minimum level from job card job=%s", job_id, exc_info=True)
+            return 0
+        min_level = _extract_min_level_from_embed(msg.embeds[0]) if msg.embeds else 0
+        await db.set_job_min_level(int(job_id), int(min_level))
+    _JOB_MIN_LEVELS[int(job_id)] = int(min_level)
+    return int(min_level)
+
+
+async def _render_job_card(bot, db: Database, job_id: int) -> tuple[dict, str] | None:
+    """
+    Current job state as PartialMessage.edit kwargs (no files: the logo attachment is kept),
+    plus a fingerprint of what the card will show.
+    """
+    row = await db.get_job(int(job_id))
+    if not row:
+        return None
+
+    (
+        jid,
+        channel_id,
+        message_id,
+        title,
+        description,
+        reward,
+        status,
+        created_by,
+        claimed_by,
+        thread_id,
+        created_at,
+        updated_at,
+    ) = row
+
+    category = await db.get_job_category(int(jid))
+    is_event_job = str(category or "").strip().lower() == "event"
+    locked = False
+    attendee_ids = None
+    if is_event_job:
+        locked = await db.get_job_attendance_lock(int(jid))
+        attendee_ids = await db.get_job_attendance_snapshot(int(jid)) if locked else [int(a[0]) for a in await db.list_event_attendees(int(jid))]
+
+    min_level = await _job_card_min_level(bot, db, int(jid), int(channel_id), int(message_id))
+    embed = _job_embed(
+        int(jid),
+        str(title),
+        str(description),
+        int(reward),
+        str(status),
+        int(created_by),
+        int(claimed_by) if claimed_by else None,
+        min_level=int(min_level),
+        is_event=is_event_job,
+        attendee_ids=attendee_ids,
+        attendance_locked=bool(locked),
+    )
+    has_view = str(status) != "cancelled"
+    view = JobWorkflowView(db, status=str(status), is_event=is_event_job) if has_view else None
+    # The view is fully determined by status/is_event, so those stand in for it.
+    shown = {"embed": embed.to_dict(), "view": [str(status), is_event_job] if has_view else None}
+    fingerprint = hashlib.sha1(json.dumps(shown, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return {"embed": embed, "view": view}, fingerprint
+
+
+def _job_card_render(bot, db: Database, job_id: int, message_id: int, skip_unchanged: bool = False):
+    """(render, after) for CardUpdater: after records the fingerprint once the edit went out."""
+    sent: dict[str, str] = {}
+
+    async def render() -> dict | None:
+        rendered = await _render_job_card(bot, db, int(job_id))
+        if rendered is None:
+            return None
+        kwargs, fingerprint = rendered
+        if skip_unchanged and await db.get_job_card_fingerprint(int(message_id)) == fingerprint:
+            return None
+        sent["fingerprint"] = fingerprint
+        return kwargs
+
+    async def after() -> None:
+        await db.set_job_card_fingerprint(int(message_id), int(job_id), sent["fingerprint"])
+
+    return render, after
+
+
+async def _queue_job_cards(
+    bot,
+    db: Database,
+    job_id: int,
+    min_level: int | None = None,
+    skip_unchanged: bool = False,
+) -> None:
+    """Queue the main card and the thread control card; both render the job's latest state once the window closes."""
+    row = await db.get_job(int(job_id))
+    if not row:
+        return
+    channel_id, message_id, thread_id = row[1], row[2], row[9]
+    if min_level is not None and _JOB_MIN_LEVELS.get(int(job_id)) != int(min_level):
+        _JOB_MIN_LEVELS[int(job_id)] = int(min_level)
+        await db.set_job_min_level(int(job_id), int(min_level))
+
+    updater = _card_updates(bot)
+    updater.schedule(int(channel_id), int(message_id), *_job_card_render(bot, db, int(job_id), int(message_id), skip_unchanged))
+    control_id = await db.get_job_thread_control_message(int(job_id))
+    if control_id and thread_id:
+        updater.schedule(int(thread_id), int(control_id), *_job_card_render(bot, db, int(job_id), int(control_id), skip_unchanged))
+
+
 class JobAreaSelectView(discord.ui.View):
     def __init__(self, cog: "JobsCog"):
         super().__init__(timeout=120)
@@ -422,13 +541,10 @@ class JobPostModal(discord.ui.Modal):
             if not interaction.guild:
                 return await interaction.followup.send("Guild context missing for jobs channel routing.", ephemeral=True)
 
-            # Read live guild-scoped routing config so /setup changes apply without restart.
-            guild_settings = await self.cog.db.get_guild_settings(interaction.guild.id)
-            map_raw_live = guild_settings.get("JOB_CATEGORY_CHANNEL_MAP", "") or ""
-            map_live = _parse_job_category_channel_map(map_raw_live) if map_raw_live else JOB_CATEGORY_CHANNEL_MAP
-
-            jobs_channel_live_raw = guild_settings.get("JOBS_CHANNEL_ID", "") or ""
-            jobs_channel_live = int(jobs_channel_live_raw) if str(jobs_channel_live_raw).isdigit() else JOBS_CHANNEL_ID
+            # Live guild-scoped routing config (cached, parsed) so /setup changes apply without restart.
+            gid = interaction.guild.id
+            map_live = await self.cog.db.get_guild_setting_parsed(gid, "JOB_CATEGORY_CHANNEL_MAP", JOB_CATEGORY_CHANNEL_MAP)
+            jobs_channel_live = await self.cog.db.get_guild_setting_parsed(gid, "JOBS_CHANNEL_ID", JOBS_CHANNEL_ID)
 
             category_key = str(self.category or "general").strip().lower()
             routed_id = map_live.get(category_key)
@@ -461,6 +577,7 @@ class JobPostModal(discord.ui.Modal):
                     category=self.category,
                     template_id=self.template_id,
                     guild_id=(interaction.guild.id if interaction.guild else None),
+                    min_level=self.min_level,
                 )
             except ValueError as e:
                 await msg.delete()
@@ -889,54 +1006,9 @@ class JobWorkflowView(discord.ui.View):
         if not ok:
             return await interaction.followup.send(f"Cannot complete Job #{job_id_db} (status: {_status_text(status)}).", ephemeral=True)
 
+        # Main card and thread control card are re-rendered together, coalesced with any follow-up confirm.
         min_level = _extract_min_level_from_embed(interaction.message.embeds[0]) if interaction.message.embeds else 0
-        category = await self.db.get_job_category(int(job_id_db))
-        is_event_job = str(category or "").strip().lower() == "event"
-        updated = _job_embed(
-            job_id_db,
-            title,
-            description,
-            int(reward),
-            "completed",
-            created_by,
-            claimed_by,
-            min_level=min_level,
-            is_event=is_event_job,
-        )
-
-        files = _logo_files()
-        await interaction.message.edit(
-            embed=updated,
-            view=JobWorkflowView(self.db, status="completed", is_event=is_event_job),
-            files=files if files else None,
-        )
-
-        # Keep both main card and thread control card synced.
-        if interaction.guild:
-            try:
-                if int(message_id) != int(interaction.message.id):
-                    main_ch = interaction.guild.get_channel(int(channel_id)) or await interaction.guild.fetch_channel(int(channel_id))
-                    main_msg = await main_ch.fetch_message(int(message_id))
-                    await main_msg.edit(
-                        embed=updated,
-                        view=JobWorkflowView(self.db, status="completed", is_event=is_event_job),
-                        files=_logo_files() or None,
-                    )
-            except Exception:
-                logger.debug("Failed syncing main job card after complete job=%s", job_id_db, exc_info=True)
-
-            try:
-                control_id = await self.db.get_job_thread_control_message(int(job_id_db))
-                if control_id and thread_id:
-                    th = interaction.guild.get_thread(int(thread_id)) or await interaction.guild.fetch_channel(int(thread_id))
-                    tmsg = await th.fetch_message(int(control_id))
-                    await tmsg.edit(
-                        embed=updated,
-                        view=JobWorkflowView(self.db, status="completed", is_event=is_event_job),
-                        files=_logo_files() or None,
-                    )
-            except Exception:
-                logger.debug("Failed syncing thread control card after complete job=%s", job_id_db, exc_info=True)
+        await _queue_job_cards(interaction.client, self.db, int(job_id_db), min_level=min_level)
 
         if thread_id and interaction.guild:
             try:
@@ -1028,43 +1100,24 @@ class JobWorkflowView(discord.ui.View):
                     if amt > 0:
                         payout_targets.append((int(uid), int(amt)))
 
-        settlement = await self.db.settle_job_payout(
+        settlement = await self.db.settle_and_credit_job_payout(
             int(job_id_db),
             payout_targets,
             confirmed_by=interaction.user.id,
             guild_id=(interaction.guild.id if interaction.guild else None),
+            rep_per_target=int(REP_PER_JOB_PAYOUT),
+            per_level=LEVEL_PER_REP,
+            event_snapshot=(category == "event"),
         )
         if not settlement.get("ok"):
             return await interaction.followup.send("Could not mark as paid (maybe already paid).", ephemeral=True)
 
         paid_targets: list[tuple[int, int]] = list(settlement.get("paid_targets") or [])
+        rep_added_total = int(settlement.get("rep_added") or 0)
+        levels: dict[int, tuple[int, int]] = settlement.get("levels") or {}
 
-        rep_added_total = 0
-        payout_note_parts: list[str] = []
-        for uid, amount in paid_targets:
-            await self.db.add_balance(
-                discord_id=int(uid),
-                amount=int(amount),
-                tx_type="payout",
-                reference=f"job:{job_id_db}|by:{interaction.user.id}",
-                guild_id=(interaction.guild.id if interaction.guild else None),
-            )
-            payout_note_parts.append(f"{uid}:{int(amount)}")
-
-            before_level = await self.db.get_level(int(uid), per_level=LEVEL_PER_REP, guild_id=(interaction.guild.id if interaction.guild else None))
-            if int(REP_PER_JOB_PAYOUT) > 0:
-                try:
-                    await self.db.add_rep(
-                        discord_id=int(uid),
-                        amount=int(REP_PER_JOB_PAYOUT),
-                        reference=f"job:{job_id_db}|confirm_by:{interaction.user.id}",
-                        guild_id=(interaction.guild.id if interaction.guild else None),
-                    )
-                    rep_added_total += int(REP_PER_JOB_PAYOUT)
-                except Exception:
-                    logger.debug("Failed adding rep for job confirm", exc_info=True)
-
-            if interaction.guild:
+        if interaction.guild:
+            for uid, (before_level, _after_level) in levels.items():
                 member_obj = interaction.guild.get_member(int(uid))
                 if member_obj is None:
                     try:
@@ -1074,64 +1127,8 @@ class JobWorkflowView(discord.ui.View):
                 if member_obj is not None:
                     await _sync_member_tier_roles(self.db, member_obj, notify_dm=True, before_level=int(before_level))
 
-        if category == "event":
-            await self.db.add_ledger_entry(
-                entry_type="event_payout_snapshot",
-                amount=int(reward),
-                from_account=f"job:{int(job_id_db)}",
-                to_account=f"attendees:{len(payout_targets)}",
-                reference_type="job",
-                reference_id=str(int(job_id_db)),
-                notes=";".join(payout_note_parts),
-            )
-            await self.db.conn.commit()
-
         min_level = _extract_min_level_from_embed(interaction.message.embeds[0]) if interaction.message.embeds else 0
-        is_event_job = str(category or "").strip().lower() == "event"
-        updated = _job_embed(
-            job_id_db,
-            title,
-            description,
-            int(reward),
-            "paid",
-            created_by,
-            claimed_by,
-            min_level=min_level,
-            is_event=is_event_job,
-        )
-
-        files = _logo_files()
-        await interaction.message.edit(
-            embed=updated,
-            view=JobWorkflowView(self.db, status="paid", is_event=is_event_job),
-            files=files if files else None,
-        )
-
-        if interaction.guild:
-            try:
-                if int(message_id) != int(interaction.message.id):
-                    main_ch = interaction.guild.get_channel(int(channel_id)) or await interaction.guild.fetch_channel(int(channel_id))
-                    main_msg = await main_ch.fetch_message(int(message_id))
-                    await main_msg.edit(
-                        embed=updated,
-                        view=JobWorkflowView(self.db, status="paid", is_event=is_event_job),
-                        files=_logo_files() or None,
-                    )
-            except Exception:
-                logger.debug("Failed syncing main job card after confirm job=%s", job_id_db, exc_info=True)
-
-            try:
-                control_id = await self.db.get_job_thread_control_message(int(job_id_db))
-                if control_id and thread_id:
-                    th = interaction.guild.get_thread(int(thread_id)) or await interaction.guild.fetch_channel(int(thread_id))
-                    tmsg = await th.fetch_message(int(control_id))
-                    await tmsg.edit(
-                        embed=updated,
-                        view=JobWorkflowView(self.db, status="paid", is_event=is_event_job),
-                        files=_logo_files() or None,
-                    )
-            except Exception:
-                logger.debug("Failed syncing thread control card after confirm job=%s", job_id_db, exc_info=True)
+        await _queue_job_cards(interaction.client, self.db, int(job_id_db), min_level=min_level)
 
         paid_total = int(sum(int(a) for _, a in paid_targets))
         bond_total = int(settlement.get("bond_amount") or 0)
@@ -1183,132 +1180,71 @@ class JobsCog(commands.Cog):
         self.bot = bot
         self.db = db
         self._startup_event_refresh_done = False
+        self._startup_event_refresh_task: asyncio.Task | None = None
+        # Scheduled-event RSVPs arrive in bursts; write them per job in batches.
+        self.rsvps = RsvpAggregator(db, self._refresh_event_job_card)
 
     async def _refresh_event_job_card(self, job_id: int) -> None:
-        row = await self.db.get_job(int(job_id), guild_id=(ctx.guild.id if ctx.guild else None))
-        if not row:
-            return
-
-        (
-            jid,
-            channel_id,
-            message_id,
-            title,
-            description,
-            reward,
-            status,
-            created_by,
-            claimed_by,
-            thread_id,
-            created_at,
-            updated_at,
-        ) = row
-
-        category = await self.db.get_job_category(int(jid))
+        category = await self.db.get_job_category(int(job_id))
         if str(category or "").strip().lower() != "event":
             return
+        await _queue_job_cards(self.bot, self.db, int(job_id), skip_unchanged=True)
 
-        guild = self.bot.guilds[0] if self.bot.guilds else None
-        if guild is None:
-            return
-
-        channel = guild.get_channel(int(channel_id))
-        if channel is None:
-            try:
-                channel = await guild.fetch_channel(int(channel_id))
-            except Exception:
-                return
-
+    async def _refresh_all_event_job_cards(self, limit: int = 250) -> int:
+        """
+        Re-render recent event cards, skipping any whose fingerprint shows nothing changed.
+        Edits run with at most STARTUP_CARD_REFRESH_CONCURRENCY in flight per guild.
+        """
+        cards = await self.db.list_event_job_cards(["open", "claimed", "completed", "paid"], limit=int(limit))
+        updater = _card_updates(self.bot)
+        limits: dict[int, asyncio.Semaphore] = {}
+
+        async def refresh(job_id: int, guild_id: int, channel_id: int, message_id: int) -> bool:
+            sem = limits.setdefault(int(guild_id), asyncio.Semaphore(STARTUP_CARD_REFRESH_CONCURRENCY))
+            async with sem:
+                render, after = _job_card_render(self.bot, self.db, job_id, message_id, skip_unchanged=True)
+                return await updater.push(channel_id, message_id, render, after)
+
+        results = await asyncio.gather(*(refresh(*card) for card in cards), return_exceptions=True)
+        for card, result in zip(cards, results):
+            if isinstance(result, Exception):
+                logger.debug("Failed refreshing event job card for %s", card[0], exc_info=result)
+        return sum(1 for r in results if r is True)
+
+    async def _startup_event_refresh(self) -> None:
         try:
-            msg = await channel.fetch_message(int(message_id))
+            count = await self._refresh_all_event_job_cards(limit=250)
+            logger.info("Startup event job card refresh complete: %s cards updated", count)
         except Exception:
-            return
-
-        min_level = _extract_min_level_from_embed(msg.embeds[0]) if msg.embeds else 0
-        locked = await self.db.get_job_attendance_lock(int(jid))
-        attendee_ids = await self.db.get_job_attendance_snapshot(int(jid)) if locked else [int(a[0]) for a in await self.db.list_event_attendees(int(jid))]
-
-        updated = _job_embed(
-            int(jid),
-            str(title),
-            str(description),
-            int(reward),
-            str(status),
-            int(created_by),
-            int(claimed_by) if claimed_by else None,
-            min_level=int(min_level),
-            is_event=True,
-            attendee_ids=attendee_ids,
-            attendance_locked=bool(locked),
-        )
-
-        files = _logo_files()
-        await msg.edit(
-            embed=updated,
-            view=JobWorkflowView(self.db, status=str(status), is_event=True) if str(status) != "cancelled" else None,
-            files=files if files else None,
-        )
-
-    async def _refresh_all_event_job_cards(self, limit: int = 250) -> int:
-        cur = await self.db.conn.execute(
-            "SELECT job_id FROM jobs WHERE status != 'cancelled' ORDER BY job_id DESC LIMIT ?",
-            (int(limit),),
-        )
-        rows = await cur.fetchall()
-        refreshed = 0
-        for r in rows:
-            jid = int(r[0])
-            try:
-                category = await self.db.get_job_category(int(jid))
-                if str(category or "").strip().lower() != "event":
-                    continue
-                await self._refresh_event_job_card(int(jid))
-                refreshed += 1
-            except Exception:
-                logger.debug("Failed refreshing event job card for %s", jid, exc_info=True)
-        return refreshed
+            logger.debug("Startup event job card refresh failed", exc_info=True)
 
     @commands.Cog.listener()
     async def on_ready(self):
         if self._startup_event_refresh_done:
             return
         self._startup_event_refresh_done = True
-        try:
-            count = await self._refresh_all_event_job_cards(limit=250)
-            logger.info("Startup event job card refresh complete: %s cards", count)
-        except Exception:
-            logger.debug("Startup event job card refresh failed", exc_info=True)
+        # Runs in the background so a restart mid-op doesn't hold up the rest of on_ready.
+        self._startup_event_refresh_task = asyncio.create_task(self._startup_event_refresh())
 
     @commands.Cog.listener()
     async def on_raw_scheduled_event_user_add(self, payload: discord.RawScheduledEventSubscription):
         try:
-            job_id = await self.db.get_job_id_by_event(int(payload.event_id))
-            if not job_id:
-                return
-            await self.db.add_event_attendee(int(job_id), int(payload.user_id))
-            await self._refresh_event_job_card(int(job_id))
+            await self.rsvps.submit(int(payload.event_id), int(payload.user_id), joined=True)
         except Exception:
             logger.debug("Failed syncing scheduled event RSVP add", exc_info=True)
 
     @commands.Cog.listener()
     async def on_raw_scheduled_event_user_remove(self, payload: discord.RawScheduledEventSubscription):
         try:
-            job_id = await self.db.get_job_id_by_event(int(payload.event_id))
-            if not job_id:
-                return
-            await self.db.remove_event_attendee(int(job_id), int(payload.user_id))
-            await self._refresh_event_job_card(int(job_id))
+            await self.rsvps.submit(int(payload.event_id), int(payload.user_id), joined=False)
         except Exception:
             logger.debug("Failed syncing scheduled event RSVP remove", exc_info=True)
 
-    async def _sync_attendance_from_event(self, job_id: int) -> int:
-        cur = await self.db.conn.execute("SELECT event_id FROM job_event_links WHERE job_id=?", (int(job_id),))
-        row = await cur.fetchone()
-        if not row:
+    async def _sync_attendance_from_event(self, job_id: int, guild: discord.Guild | None, force: bool = False) -> tuple[int, bool]:
+        """Returns (tracked attendees, synced); synced is False when the subscribers were unchanged since the last sync."""
+        event_id = await self.db.get_event_id_by_job(int(job_id))
+        if event_id is None:
             raise ValueError("No linked scheduled event found for this job.")
-
-        event_id = int(row[0])
-        guild = self.bot.guilds[0] if self.bot.guilds else None
         if guild is None:
             raise ValueError("Guild context unavailable for event sync.")
 
@@ -1319,21 +1255,24 @@ class JobsCog(commands.Cog):
             except Exception as e:
                 raise ValueError(f"Could not fetch scheduled event {event_id}: {e}")
 
-        existing = await self.db.list_event_attendees(int(job_id))
-        existing_ids = {int(a[0]) for a in existing}
-
+        # The count alone misses members swapping at the same total, so the subscribers are always
+        # streamed; the watermark only saves the write when the exact set is unchanged.
         seen_ids: set[int] = set()
-        async for u in event.subscribers(limit=None, as_member=True):
-            uid = int(u.id)
-            seen_ids.add(uid)
-            if uid not in existing_ids:
-                await self.db.add_event_attendee(int(job_id), uid)
-
-        for uid in existing_ids:
-            if uid not in seen_ids:
-                await self.db.remove_event_attendee(int(job_id), int(uid))
-
-        return len(seen_ids)
+        async for u in event.subscribers(limit=None, as_member=False):
+            seen_ids.add(int(u.id))
+        if not force and await self.db.is_event_attendance_synced(int(job_id), event_id, seen_ids):
+            return len(seen_ids), False
+
+        subscriber_count = getattr(event, "subscriber_count", None)
+        result = await self.db.sync_event_attendance(
+            int(job_id),
+            seen_ids,
+            event_id=event_id,
+            subscriber_count=subscriber_count,
+        )
+        if result["locked"]:
+            raise ValueError("Attendance is locked for this job. Unlock before sync.")
+        return int(result["total"]), True
 
     jobs = discord.SlashCommandGroup("jobs", "Job board commands")
     eventjob = discord.SlashCommandGroup("eventjob", "Event job posting commands")
@@ -1696,10 +1635,22 @@ class JobsCog(commands.Cog):
 
         attendees = await self.db.list_event_attendees(int(job_id))
         attendee_ids = [int(a[0]) for a in attendees]
-        await self.db.set_job_attendance_snapshot(int(job_id), attendee_ids)
+        version, created = await self.db.set_job_attendance_snapshot(int(job_id), attendee_ids)
         await self.db.set_job_attendance_lock(int(job_id), True)
         await self._refresh_event_job_card(int(job_id))
-        await ctx.respond(f"Attendance locked for Job #{int(job_id)} with `{len(attendee_ids)}` attendees.", ephemeral=True)
+        await ctx.respond(
+            f"Attendance locked for Job #{int(job_id)} with `{len(attendee_ids)}` attendees."
+            + await self._snapshot_change_note(int(job_id), version, created),
+            ephemeral=True,
+        )
+
+    async def _snapshot_change_note(self, job_id: int, version: int, created: bool) -> str:
+        if not created:
+            return f" Snapshot v{int(version)} unchanged."
+        if int(version) <= 1:
+            return ""
+        diff = await self.db.diff_job_attendance_snapshots(int(job_id), int(version) - 1, int(version))
+        return f" Snapshot v{int(version)}: +`{len(diff['added'])}` / -`{len(diff['removed'])}` since v{int(version) - 1}."
 
     @jobs.command(name="attendance_unlock", description="(Finance/Admin) Unlock event attendance list")
     @finance_or_admin()
@@ -1716,7 +1667,12 @@ class JobsCog(commands.Cog):
 
     @jobs.command(name="attendance_sync", description="(Finance/Admin) Force-sync attendance from scheduled event RSVPs")
     @finance_or_admin()
-    async def attendance_sync(self, ctx: discord.ApplicationContext, job_id: discord.Option(int, min_value=1)):
+    async def attendance_sync(
+        self,
+        ctx: discord.ApplicationContext,
+        job_id: discord.Option(int, min_value=1),
+        force: discord.Option(bool, "Rewrite attendance even if the subscribers are unchanged", default=False),
+    ):
         row = await self.db.get_job(int(job_id), guild_id=(ctx.guild.id if ctx.guild else None))
         if not row:
             return await ctx.respond("Job not found.", ephemeral=True)
@@ -1728,10 +1684,16 @@ class JobsCog(commands.Cog):
             return await ctx.respond("This command is only for event-category jobs.", ephemeral=True)
         if await self.db.get_job_attendance_lock(int(job_id)):
             return await ctx.respond("Attendance is locked for this job. Unlock before sync.", ephemeral=True)
+        await ctx.defer(ephemeral=True)
         try:
-            count = await self._sync_attendance_from_event(int(job_id))
+            count, synced = await self._sync_attendance_from_event(int(job_id), ctx.guild, force=bool(force))
         except ValueError as e:
             return await ctx.respond(str(e), ephemeral=True)
+        if not synced:
+            return await ctx.respond(
+                f"Event unchanged since the last sync for Job #{int(job_id)}. Tracked attendees: `{int(count)}`.",
+                ephemeral=True,
+            )
         await self._refresh_event_job_card(int(job_id))
         await ctx.respond(f"Attendance synced for Job #{int(job_id)}. Tracked attendees: `{int(count)}`.", ephemeral=True)
 
@@ -1746,12 +1708,10 @@ class JobsCog(commands.Cog):
         if category != "event":
             return await ctx.respond("This command is only for event-category jobs.", ephemeral=True)
 
-        cur = await self.db.conn.execute("SELECT event_id FROM job_event_links WHERE job_id=?", (int(job_id),))
-        link = await cur.fetchone()
-        if not link:
+        event_id = await self.db.get_event_id_by_job(int(job_id))
+        if event_id is None:
             return await ctx.respond("No linked scheduled event found for this job.", ephemeral=True)
 
-        event_id = int(link[0])
         guild = ctx.guild
         if guild is None:
             return await ctx.respond("Guild context required.", ephemeral=True)
@@ -1816,15 +1776,16 @@ class JobsCog(commands.Cog):
             return await ctx.respond("This command is only for event-category jobs.", ephemeral=True)
 
         await self.db.set_job_attendance_lock(int(job_id), False)
-        count = await self._sync_attendance_from_event(int(job_id))
+        count, _ = await self._sync_attendance_from_event(int(job_id), ctx.guild, force=True)
         attendees = await self.db.list_event_attendees(int(job_id))
         attendee_ids = [int(a[0]) for a in attendees]
-        await self.db.set_job_attendance_snapshot(int(job_id), attendee_ids)
+        version, created = await self.db.set_job_attendance_snapshot(int(job_id), attendee_ids)
         await self.db.set_job_attendance_lock(int(job_id), True)
         await self._refresh_event_job_card(int(job_id))
 
         await ctx.respond(
-            f"Snapshot locked for Job #{int(job_id)}. Synced RSVPs: `{int(count)}`, snapshot size: `{len(attendee_ids)}`.",
+            f"Snapshot locked for Job #{int(job_id)}. Synced RSVPs: `{int(count)}`, snapshot size: `{len(attendee_ids)}`."
+            + await self._snapshot_change_note(int(job_id), version, created),
             ephemeral=True,
         )
 
@@ -1859,35 +1820,7 @@ class JobsCog(commands.Cog):
         if not ok:
             return await ctx.respond(f"Cannot complete Job #{jid} (status: {_status_text(status)}).", ephemeral=True)
 
-        try:
-            channel = ctx.guild.get_channel(channel_id)
-            msg = await channel.fetch_message(message_id)
-
-            min_level = 0
-            if msg.embeds:
-                min_level = _extract_min_level_from_embed(msg.embeds[0])
-
-            category = await self.db.get_job_category(int(jid))
-            is_event_job = str(category or "").strip().lower() == "event"
-            updated = _job_embed(
-                jid,
-                title,
-                description,
-                int(reward),
-                "completed",
-                created_by,
-                claimed_by,
-                min_level=min_level,
-                is_event=is_event_job,
-            )
-            files = _logo_files()
-            await msg.edit(
-                embed=updated,
-                view=JobWorkflowView(self.db, status="completed", is_event=is_event_job),
-                files=files if files else None,
-            )
-        except Exception:
-            pass
+        await _queue_job_cards(self.bot, self.db, int(jid))
 
         if thread_id:
             try:
@@ -1968,112 +1901,35 @@ class JobsCog(commands.Cog):
                     if amt > 0:
                         payout_targets.append((int(uid), int(amt)))
 
-        settlement = await self.db.settle_job_payout(
+        settlement = await self.db.settle_and_credit_job_payout(
             int(jid),
             payout_targets,
             confirmed_by=ctx.author.id,
             guild_id=(ctx.guild.id if ctx.guild else None),
+            rep_per_target=int(REP_PER_JOB_PAYOUT),
+            per_level=LEVEL_PER_REP,
+            event_snapshot=(category == "event"),
         )
         if not settlement.get("ok"):
             return await ctx.respond("Could not mark as paid (maybe already paid).", ephemeral=True)
 
         paid_targets: list[tuple[int, int]] = list(settlement.get("paid_targets") or [])
+        rep_added_total = int(settlement.get("rep_added") or 0)
+        levels: dict[int, tuple[int, int]] = settlement.get("levels") or {}
 
-        rep_added_total = 0
-        payout_note_parts: list[str] = []
-        for uid, amount in paid_targets:
-            await self.db.add_balance(
-                discord_id=int(uid),
-                amount=int(amount),
-                tx_type="payout",
-                reference=f"job:{jid}|by:{ctx.author.id}",
-                guild_id=(ctx.guild.id if ctx.guild else None),
-            )
-            payout_note_parts.append(f"{uid}:{int(amount)}")
-
-            member_obj: discord.Member | None = None
-            if ctx.guild:
-                member_obj = ctx.guild.get_member(int(uid))
+        if ctx.guild:
+            for uid, (before_level, _after_level) in levels.items():
+                member_obj: discord.Member | None = ctx.guild.get_member(int(uid))
                 if member_obj is None:
                     try:
                         member_obj = await ctx.guild.fetch_member(int(uid))
                     except Exception:
                         member_obj = None
+                if member_obj is not None:
+                    await _sync_member_tier_roles(self.db, member_obj, notify_dm=True, before_level=int(before_level))
 
-            before_level = None
-            if member_obj:
-                before_level = await self.db.get_level(member_obj.id, per_level=LEVEL_PER_REP, guild_id=(ctx.guild.id if ctx.guild else None))
-
-            if int(REP_PER_JOB_PAYOUT) > 0:
-                try:
-                    await self.db.add_rep(
-                        discord_id=int(uid),
-                        amount=int(REP_PER_JOB_PAYOUT),
-                        reference=f"job:{jid}|payout_by:{ctx.author.id}",
-                        guild_id=(ctx.guild.id if ctx.guild else None),
-                    )
-                    rep_added_total += int(REP_PER_JOB_PAYOUT)
-                except Exception:
-                    pass
-
-            if member_obj and before_level is not None:
-                await _sync_member_tier_roles(self.db, member_obj, notify_dm=True, before_level=int(before_level))
-
-        if category == "event":
-            await self.db.add_ledger_entry(
-                entry_type="event_payout_snapshot",
-                amount=int(reward),
-                from_account=f"job:{int(jid)}",
-                to_account=f"attendees:{len(payout_targets)}",
-                reference_type="job",
-                reference_id=str(int(jid)),
-                notes=";".join(payout_note_parts),
-            )
-            await self.db.conn.commit()
-
-        # Update original job message
-        try:
-            channel = ctx.guild.get_channel(channel_id)
-            msg = await channel.fetch_message(message_id)
-
-            min_level = 0
-            if msg.embeds:
-                min_level = _extract_min_level_from_embed(msg.embeds[0])
-
-            is_event_job = str(category or "").strip().lower() == "event"
-            updated = _job_embed(
-                jid,
-                title,
-                description,
-                int(reward),
-                "paid",
-                created_by,
-                claimed_by,
-                min_level=min_level,
-                is_event=is_event_job,
-            )
-            files = _logo_files()
-            await msg.edit(
-                embed=updated,
-                view=JobWorkflowView(self.db, status="paid", is_event=is_event_job),
-                files=files if files else None,
-            )
-        except Exception:
-            pass
-
-        if ctx.guild and thread_id:
-            try:
-                control_id = await self.db.get_job_thread_control_message(int(jid))
-                if control_id:
-                    th = ctx.guild.get_thread(int(thread_id)) or await ctx.guild.fetch_channel(int(thread_id))
-                    tmsg = await th.fetch_message(int(control_id))
-                    await tmsg.edit(
-                        embed=updated,
-                        view=JobWorkflowView(self.db, status="paid", is_event=is_event_job),
-                        files=_logo_files() or None,
-                    )
-            except Exception:
-                pass
+        # Update original job message and thread control card
+        await _queue_job_cards(self.bot, self.db, int(jid))
 
         paid_total = int(sum(int(a) for _, a in paid_targets))
         bond_total = int(settlement.get("bond_amount") or 0)
@@ -2147,31 +2003,7 @@ class JobsCog(commands.Cog):
         if not ok:
             return await ctx.respond(f"Could not cancel Job #{jid} (status: {_status_text(status)}).", ephemeral=True)
 
-        try:
-            channel = ctx.guild.get_channel(channel_id)
-            msg = await channel.fetch_message(message_id)
-
-            min_level = 0
-            if msg.embeds:
-                min_level = _extract_min_level_from_embed(msg.embeds[0])
-
-            category = await self.db.get_job_category(int(jid))
-            is_event_job = str(category or "").strip().lower() == "event"
-            updated = _job_embed(
-                jid,
-                title,
-                description,
-                int(reward),
-                "cancelled",
-                created_by,
-                claimed_by,
-                min_level=min_level,
-                is_event=is_event_job,
-            )
-            files = _logo_files()
-            await msg.edit(embed=updated, view=None, files=files if files else None)
-        except Exception:
-            pass
+        await _queue_job_cards(self.bot, self.db, int(jid))
 
         if thread_id:
             try:
@@ -2210,48 +2042,11 @@ class JobsCog(commands.Cog):
             return await ctx.respond(f"Only cancelled jobs can be reopened (status: {_status_text(status)}).", ephemeral=True)
 
         try:
-            await self.db.conn.execute(
-                """
-                UPDATE jobs
-                SET status='open', claimed_by=NULL, thread_id=NULL, updated_at=datetime('now')
-                WHERE job_id=?
-                """,
-                (int(jid),),
-            )
-            await self.db.conn.commit()
+            await self.db.reopen_job(int(jid))
         except Exception:
             return await ctx.respond("Failed to reopen job (DB error).", ephemeral=True)
 
-        try:
-            channel = ctx.guild.get_channel(channel_id)
-            msg = await channel.fetch_message(message_id)
-
-            min_level = 0
-            if msg.embeds:
-                min_level = _extract_min_level_from_embed(msg.embeds[0])
-
-            category = await self.db.get_job_category(int(jid))
-            is_event_job = str(category or "").strip().lower() == "event"
-            updated = _job_embed(
-                jid,
-                title,
-                description,
-                int(reward),
-                "open",
-                created_by,
-                None,
-                min_level=min_level,
-                is_event=is_event_job,
-            )
-
-            files = _logo_files()
-            await msg.edit(
-                embed=updated,
-                view=JobWorkflowView(self.db, status="open", is_event=is_event_job),
-                files=files if files else None,
-            )
-        except Exception:
-            pass
+        await _queue_job_cards(self.bot, self.db, int(jid))
 
         await ctx.respond(f"Job #{jid} reopened and set back to OPEN.", ephemeral=True)
 
@@ -1,12 +1,19 @@
+import logging
 from pathlib import Path
 
 import discord
 from discord.ext import commands
 
+from services.guild_config import parse_job_category_channel_map
 from services.permissions import is_admin_member, is_finance, is_jobs_admin
 
+logger = logging.getLogger(__name__)
+
 ENV_PATH = Path(__file__).resolve().parent.parent / ".env"
 
+# (mtime_ns, size, parsed) of the last .env read; re-parsed only when the file changes.
+_ENV_CACHE: tuple[int, int, dict[str, str]] | None = None
+
 
 class StockBuyModal(discord.ui.Modal):
     def __init__(self):
@@ -26,24 +33,17 @@ class StockBuyModal(discord.ui.Modal):
             return await interaction.response.send_message("Stock system unavailable right now.", ephemeral=True)
 
         gid = interaction.guild.id if interaction.guild else None
-        live_price = await stock_cog._get_live_stock_price(guild_id=gid)
-        cost = int(stocks) * int(live_price)
-
+        await interaction.response.defer(ephemeral=True)
         try:
-            await db.buy_shares(
-                interaction.user.id,
-                shares_delta=int(stocks),
-                cost=int(cost),
-                reference=f"buy {stocks}",
-                guild_id=gid,
-            )
-            await db.record_stock_trade_metrics(side="buy", units=int(stocks), guild_id=gid)
-            await stock_cog._reprice_from_metrics(guild_id=gid)
-        except ValueError as e:
-            return await interaction.response.send_message(str(e), ephemeral=True)
+            fill = await db.trades.submit(interaction.user.id, "buy", int(stocks), guild_id=gid, reference=f"buy {stocks}")
+        except Exception:
+            logger.exception("Stock buy failed for user %s", interaction.user.id)
+            return await interaction.followup.send("Purchase failed (DB error). Nothing was charged.", ephemeral=True)
+        if not fill.ok:
+            return await interaction.followup.send(fill.error, ephemeral=True)
 
-        await interaction.response.send_message(
-            f"✅ Purchased `{stocks:,}` stocks for `{cost:,} aUEC` (price `{live_price:,} aUEC`).",
+        await interaction.followup.send(
+            f"✅ Purchased `{fill.units:,}` stocks for `{fill.cost:,} aUEC` (price `{fill.price:,} aUEC`).",
             ephemeral=True,
         )
 
@@ -176,12 +176,14 @@ class StockSellModal(discord.ui.Modal):
                 ephemeral=True,
             )
 
+        await interaction.response.defer(ephemeral=True)
         try:
-            await db.lock_shares(interaction.user.id, int(stocks), guild_id=gid)
-            await db.record_stock_trade_metrics(side="sell", units=int(stocks), guild_id=gid)
-            await stock_cog._reprice_from_metrics(guild_id=gid)
-        except ValueError as e:
-            return await interaction.response.send_message(str(e), ephemeral=True)
+            fill = await db.trades.submit(interaction.user.id, "sell", int(stocks), guild_id=gid, reference=f"sell {stocks}")
+        except Exception:
+            logger.exception("Stock sell failed for user %s", interaction.user.id)
+            return await interaction.followup.send("Sell request failed (DB error). No stocks were locked.", ephemeral=True)
+        if not fill.ok:
+            return await interaction.followup.send(fill.error, ephemeral=True)
 
         env = {}
         setup_cog = interaction.client.get_cog("SetupCog")
@@ -211,7 +213,7 @@ class StockSellModal(discord.ui.Modal):
         embed = stock_cog._cashout_embed(request_id, interaction.user.id, int(stocks), "pending")
         await msg.edit(embed=embed, view=view)
 
-        await interaction.response.send_message(
+        await interaction.followup.send(
             f"Cash-out request **#{request_id}** created. `{stocks:,}` stocks are now locked until reviewed.",
             ephemeral=True,
         )
@@ -256,7 +258,7 @@ class StockBoardView(discord.ui.View):
         metrics = await stock_cog.db.get_stock_trade_metrics(guild_id=gid)
         net_units = int(metrics.get("net_units_24h") or 0)
         await interaction.response.send_message(
-            f"📈 Current stock price: `{price:,} aUEC`\nNet demand since reset: `{net_units:+,}` units",
+            f"📈 Current stock price: `{price:,} aUEC`\nNet demand (24h): `{net_units:+,}` units",
             ephemeral=True,
         )
 
@@ -584,16 +586,23 @@ class SetupCog(commands.Cog):
             return str(ch.id), None
 
     def _read_env(self) -> dict[str, str]:
+        global _ENV_CACHE
+        try:
+            st = ENV_PATH.stat()
+        except OSError:
+            return {}
+        if _ENV_CACHE is not None and _ENV_CACHE[:2] == (st.st_mtime_ns, st.st_size):
+            return dict(_ENV_CACHE[2])
+
         data: dict[str, str] = {}
-        if not ENV_PATH.exists():
-            return data
         for line in ENV_PATH.read_text(encoding="utf-8").splitlines():
             line = line.strip()
             if not line or line.startswith("#") or "=" not in line:
                 continue
             k, v = line.split("=", 1)
             data[k.strip()] = v.strip()
-        return data
+        _ENV_CACHE = (st.st_mtime_ns, st.st_size, data)
+        return dict(data)
 
     def _write_env(self, updates: dict[str, str]) -> None:
         existing = self._read_env()
@@ -930,16 +939,7 @@ class SetupCog(commands.Cog):
                 else:
                     checks_ok.append(f"{ck} <#{ch.id}> permission check passed")
 
-        map_raw = env.get("JOB_CATEGORY_CHANNEL_MAP", "")
-        area_map = {}
-        if map_raw:
-            for part in map_raw.split(","):
-                part = part.strip()
-                if not part or ":" not in part:
-                    continue
-                k, v = part.split(":", 1)
-                if v.strip().isdigit():
-                    area_map[k.strip().lower()] = int(v.strip())
+        area_map = parse_job_category_channel_map(env.get("JOB_CATEGORY_CHANNEL_MAP", ""))
 
         expected_areas = ["general", "salvage", "mining", "hauling", "event"]
         for area in expected_areas:
@@ -1,9 +1,14 @@
 import os
+import io
+import time
+import asyncio
 import logging
 import discord
 from discord.ext import commands
 
+from services.charts import CHART_RANGES, ChartCache, render_price_chart
 from services.db import Database
+from services.market import candle_resolution_for
 from services.permissions import is_finance_or_admin
 
 ASSET_ORG_LOGO_PNG = "assets/org_logo.png"
@@ -35,78 +40,40 @@ class StockCog(commands.Cog):
     def __init__(self, bot: commands.Bot, db: Database):
         self.bot = bot
         self.db = db
+        self._charts = ChartCache()
 
     stock = discord.SlashCommandGroup("stock", "Stock market commands")
 
 
     async def _get_live_stock_price(self, guild_id: int | None = None) -> int:
-        state = await self.db.get_stock_price_state(guild_id=guild_id)
-        price = int(state.get("current_price") or 0)
-        if price > 0:
-            return int(price)
-
-        cfg = await self.db.get_stock_market_config(guild_id=guild_id)
-        base = int(cfg.get("base_price") or DEFAULT_STOCK_PRICE)
-        await self.db.set_stock_price_state(guild_id=guild_id, current_price=int(base), day_open_price=int(base), day_high_price=int(base), day_low_price=int(base))
-        return int(base)
+        return await self.db.market.live_price(guild_id)
 
     async def _reprice_from_metrics(self, guild_id: int | None = None) -> tuple[int, int, int]:
-        cfg = await self.db.get_stock_market_config(guild_id=guild_id)
-        state = await self.db.get_stock_price_state(guild_id=guild_id)
-        metrics = await self.db.get_stock_trade_metrics(guild_id=guild_id)
-
-        current = int(state.get("current_price") or cfg.get("base_price") or DEFAULT_STOCK_PRICE)
-        day_open = int(state.get("day_open_price") or current)
-        net_units = int(metrics.get("net_units_24h") or 0)
-
-        sensitivity_bps = int(cfg.get("demand_sensitivity_bps") or 50)
-        cap_bps = max(0, int(cfg.get("daily_move_cap_bps") or 500))
-        step_units = 100
-        demand_steps = int(net_units // step_units)
-        demand_bps = max(-cap_bps, min(cap_bps, demand_steps * sensitivity_bps))
-
-        raw_price = int(round(current * (10000 + demand_bps) / 10000))
-
-        min_price = int(cfg.get("min_price") or 1)
-        max_price = int(cfg.get("max_price") or 10**12)
-
-        day_floor = int(round(day_open * (10000 - cap_bps) / 10000))
-        day_ceiling = int(round(day_open * (10000 + cap_bps) / 10000))
-
-        lower = max(min_price, day_floor)
-        upper = min(max_price, day_ceiling)
-        if lower > upper:
-            lower, upper = upper, lower
-
-        new_price = min(max(raw_price, lower), upper)
-
-        await self.db.set_stock_price_state(guild_id=guild_id, current_price=int(new_price))
-        return int(current), int(new_price), int(demand_bps)
+        # Pricing runs in memory (services/market.py); state is persisted by the market flush.
+        return await self.db.market.reprice(guild_id)
 
     async def _manual_price_adjust_bps(self, delta_bps: int, guild_id: int | None = None) -> tuple[int, int]:
-        cfg = await self.db.get_stock_market_config(guild_id=guild_id)
-        state = await self.db.get_stock_price_state(guild_id=guild_id)
-        current = int(state.get("current_price") or cfg.get("base_price") or DEFAULT_STOCK_PRICE)
-        day_open = int(state.get("day_open_price") or current)
-
-        cap_bps = max(0, int(cfg.get("daily_move_cap_bps") or 500))
-        min_price = int(cfg.get("min_price") or 1)
-        max_price = int(cfg.get("max_price") or 10**12)
-
-        bounded_delta = max(-cap_bps, min(cap_bps, int(delta_bps)))
-        raw_price = int(round(current * (10000 + bounded_delta) / 10000))
-
-        day_floor = int(round(day_open * (10000 - cap_bps) / 10000))
-        day_ceiling = int(round(day_open * (10000 + cap_bps) / 10000))
-
-        lower = max(min_price, day_floor)
-        upper = min(max_price, day_ceiling)
-        if lower > upper:
-            lower, upper = upper, lower
+        return await self.db.market.nudge(int(delta_bps), guild_id)
+
+    async def _market_chart_file(self, guild_id: int | None, chart_range: str) -> discord.File:
+        window = CHART_RANGES.get(chart_range) or CHART_RANGES["7d"]
+        gid = int(guild_id) if guild_id is not None else 0
+        version = await self.db.market.price_version(gid)
+
+        async def render() -> bytes:
+            # Buffered price points must be in the candle tables before they are charted.
+            await self.db.market.flush(gid)
+            since = int(time.time()) - window
+            spark = await self.db.list_stock_candles(gid, candle_resolution_for(window), since)
+            bars = await self.db.list_stock_candles(gid, 3600 if window <= 86400 else 86400, since)
+            return await asyncio.to_thread(
+                render_price_chart,
+                [c[4] for c in spark],
+                [c[1:5] for c in bars],
+            )
 
-        new_price = min(max(raw_price, lower), upper)
-        await self.db.set_stock_price_state(guild_id=guild_id, current_price=int(new_price))
-        return int(current), int(new_price)
+        data = await self._charts.get_or_render((gid, chart_range, version), render)
+        return discord.File(io.BytesIO(data), filename="stock_chart.png")
 
     @staticmethod
     def _cashout_embed(request_id: int, requester_id: int, stocks: int, status: str) -> discord.Embed:
@@ -129,36 +96,33 @@ class StockCog(commands.Cog):
         if stocks < 1:
             return await ctx.respond("Stocks must be at least 1.", ephemeral=True)
 
-        live_price = await self._get_live_stock_price(guild_id=(ctx.guild.id if ctx.guild else None))
-        cost = int(stocks) * int(live_price)
+        # The fill settles with the next market tick; defer so a busy tick can't time out the interaction.
+        await ctx.defer(ephemeral=True)
         try:
-            await self.db.buy_shares(
+            fill = await self.db.trades.submit(
                 ctx.author.id,
-                shares_delta=int(stocks),
-                cost=int(cost),
-                reference=f"buy {stocks}",
-                guild_id=(ctx.guild.id if ctx.guild else None),
-            )
-            await self.db.record_stock_trade_metrics(
-                side="buy",
-                units=int(stocks),
+                "buy",
+                int(stocks),
                 guild_id=(ctx.guild.id if ctx.guild else None),
+                reference=f"buy {stocks}",
             )
-            await self._reprice_from_metrics(guild_id=(ctx.guild.id if ctx.guild else None))
-        except ValueError as e:
-            return await ctx.respond(str(e), ephemeral=True)
+        except Exception:
+            logger.exception("Stock buy failed for user %s", ctx.author.id)
+            return await ctx.followup.send("Purchase failed (DB error). Nothing was charged.", ephemeral=True)
+        if not fill.ok:
+            return await ctx.followup.send(fill.error, ephemeral=True)
 
         embed = discord.Embed(
             title="✅ STOCKS PURCHASED",
             description=(
-                f"Purchased `{int(stocks):,}` stocks for `{int(cost):,} aUEC`.\n"
-                f"Price per stock: `{int(live_price):,} aUEC`."
+                f"Purchased `{int(fill.units):,}` stocks for `{int(fill.cost):,} aUEC`.\n"
+                f"Price per stock: `{int(fill.price):,} aUEC`."
             ),
             colour=discord.Colour.green(),
         )
         embed.set_thumbnail(url="attachment://org_logo.png")
         embed.add_field(name="Migration Notice", value="Stock system is now live and replaces legacy share command flow.", inline=False)
-        await ctx.respond(embed=embed, files=_logo_files(), ephemeral=True)
+        await ctx.followup.send(embed=embed, files=_logo_files(), ephemeral=True)
 
     @stock.command(name="sell", description="Request to cash-out by selling stocks (locks stocks until handled)")
     async def sell(self, ctx: discord.ApplicationContext, stocks: int):
@@ -176,15 +140,18 @@ class StockCog(commands.Cog):
             )
 
         try:
-            await self.db.lock_shares(ctx.author.id, int(stocks), guild_id=(ctx.guild.id if ctx.guild else None))
-            await self.db.record_stock_trade_metrics(
-                side="sell",
-                units=int(stocks),
+            fill = await self.db.trades.submit(
+                ctx.author.id,
+                "sell",
+                int(stocks),
                 guild_id=(ctx.guild.id if ctx.guild else None),
+                reference=f"sell {stocks}",
             )
-            await self._reprice_from_metrics(guild_id=(ctx.guild.id if ctx.guild else None))
-        except ValueError as e:
-            return await ctx.followup.send(str(e), ephemeral=True)
+        except Exception:
+            logger.exception("Stock sell failed for user %s", ctx.author.id)
+            return await ctx.followup.send("Sell request failed (DB error). No stocks were locked.", ephemeral=True)
+        if not fill.ok:
+            return await ctx.followup.send(fill.error, ephemeral=True)
 
         post_channel: discord.abc.MessageableChannel = ctx.channel
         target_channel_id = SHARES_SELL_CHANNEL_ID or FINANCE_CHANNEL_ID
@@ -249,22 +216,17 @@ class StockCog(commands.Cog):
     @finance_or_admin()
     async def price_set(self, ctx: discord.ApplicationContext, price: int):
         gid = (ctx.guild.id if ctx.guild else None)
-        cfg = await self.db.get_stock_market_config(guild_id=gid)
-        min_price = int(cfg.get("min_price") or 1)
-        max_price = int(cfg.get("max_price") or 10**12)
-        bounded = min(max(int(price), min_price), max_price)
-        state = await self.db.get_stock_price_state(guild_id=gid)
-        day_open = int(state.get("day_open_price") or bounded)
-        cap_bps = max(0, int(cfg.get("daily_move_cap_bps") or 500))
-        floor = int(round(day_open * (10000 - cap_bps) / 10000))
-        ceil = int(round(day_open * (10000 + cap_bps) / 10000))
-        bounded = min(max(int(bounded), max(min_price, floor)), min(max_price, ceil))
-        old = int(state.get("current_price") or bounded)
-        await self.db.set_stock_price_state(guild_id=gid, current_price=int(bounded))
+        old, bounded = await self.db.market.set_price_bounded(int(price), guild_id=gid)
         await ctx.respond(f"Stock price set: `{old:,} -> {int(bounded):,} aUEC`.", ephemeral=True)
 
     @stock.command(name="market", description="View stock market price and movement")
-    async def market(self, ctx: discord.ApplicationContext):
+    async def market(
+        self,
+        ctx: discord.ApplicationContext,
+        chart_range: discord.Option(str, name="range", choices=list(CHART_RANGES), default="7d"),
+    ):
+        # Candle reads and chart rendering can outlast the interaction's initial response window.
+        await ctx.defer(ephemeral=True)
         gid = (ctx.guild.id if ctx.guild else None)
         cfg = await self.db.get_stock_market_config(guild_id=gid)
         state = await self.db.get_stock_price_state(guild_id=gid)
@@ -286,20 +248,29 @@ class StockCog(commands.Cog):
         embed.add_field(name="Current Price", value=f"`{current:,} aUEC`", inline=True)
         embed.add_field(name="Change (since open)", value=f"`{fmt_bps(change_24h_bps)}`", inline=True)
         embed.add_field(name="7d Trend", value=f"`{fmt_bps(change_7d_bps)}`", inline=True)
-        embed.add_field(name="Net Flow (since reset)", value=f"`{int(metrics.get('net_units_24h') or 0):,}` units", inline=True)
+        embed.add_field(name="Net Flow (24h)", value=f"`{int(metrics.get('net_units_24h') or 0):,}` units", inline=True)
         embed.add_field(name="Floor / Ceiling", value=f"`{int(cfg.get('min_price') or 0):,}` / `{int(cfg.get('max_price') or 0):,}`", inline=True)
         embed.add_field(name="Daily Move Cap", value=f"`{int(cfg.get('daily_move_cap_bps') or 0)/100:.2f}%`", inline=True)
 
-        await ctx.respond(embed=embed, files=_logo_files(), ephemeral=True)
+        files = _logo_files()
+        try:
+            files.append(await self._market_chart_file(gid, str(chart_range)))
+            embed.set_image(url="attachment://stock_chart.png")
+            embed.set_footer(text=f"Chart: last {chart_range} • line = price, bars = candles")
+        except Exception:
+            logger.exception("Failed to render stock chart for guild %s", gid)
+
+        await ctx.followup.send(embed=embed, files=files, ephemeral=True)
 
     @stock.command(name="portfolio", description="View your stock holdings and account balance")
     async def portfolio(self, ctx: discord.ApplicationContext):
         gid = (ctx.guild.id if ctx.guild else None)
-        bal = await self.db.get_balance(ctx.author.id, guild_id=gid)
-        total = await self.db.get_shares(ctx.author.id, guild_id=gid)
-        locked = await self.db.get_shares_locked(ctx.author.id, guild_id=gid)
-        available = await self.db.get_shares_available(ctx.author.id, guild_id=gid)
-        pending_bonds_count, pending_bonds_total = await self.db.get_user_outstanding_bonds(ctx.author.id, guild_id=gid)
+        snap = await self.db.get_account_snapshot(ctx.author.id, guild_id=gid)
+        bal = snap.balance
+        total = snap.shares
+        locked = snap.shares_locked
+        available = snap.shares_available
+        pending_bonds_count, pending_bonds_total = snap.pending_bonds_count, snap.pending_bonds_total
 
         embed = discord.Embed(
             title="📈 STOCK PORTFOLIO",
@@ -313,8 +284,7 @@ class StockCog(commands.Cog):
         embed.add_field(name="Stocks (Locked)", value=f"`{int(locked):,}`", inline=True)
         embed.add_field(name="Pending Bonds", value=f"`{int(pending_bonds_count):,}`", inline=True)
         embed.add_field(name="Outstanding Bonds", value=f"`{int(pending_bonds_total):,} aUEC`", inline=True)
-        live_price = await self._get_live_stock_price(guild_id=gid)
-        embed.set_footer(text=f"Current stock price: {int(live_price):,} aUEC")
+        embed.set_footer(text=f"Current stock price: {int(snap.live_price):,} aUEC")
 
         await ctx.respond(embed=embed, files=_logo_files(), ephemeral=True)
 
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Sweep stock_market_config candidates against historical or synthetic order flow.
+
+Examples:
+  python scripts/backtest_pricing.py --db orgbot.db --guild 1234 --sensitivity 10:200:10 --cap 100:1000:100
+  python scripts/backtest_pricing.py --synthetic 2160 --seed 7 --sensitivity 25,50,75 --csv sweep.csv
+
+Historical flow includes transactions already moved to the cold archive (--archive-dir).
+
+This is a bucketed approximation: trades inside one bucket all fill at the bucket's opening
+price and the market reprices once per bucket, where the live bot reprices every trade tick.
+Smaller --bucket-minutes track the live market more closely.
+
+Needs numpy, which the bot itself does not: pip install -r requirements-backtest.txt
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("backtest_pricing.py needs numpy: pip install -r requirements-backtest.txt")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.archive import ARCHIVE_DIR  # noqa: E402
+from services.backtest import config_grid, load_order_flow, simulate, synthetic_order_flow  # noqa: E402
+from services.market import DEFAULT_STOCK_PRICE  # noqa: E402
+
+
+def _values(spec: str | None) -> list[int] | None:
+    """'a,b,c' or 'start:stop:step' (stop inclusive)."""
+    if not spec:
+        return None
+    if ":" in spec:
+        start, stop, step = (int(x) for x in spec.split(":"))
+        return list(range(start, stop + 1, max(1, step)))
+    return [int(x) for x in spec.split(",") if x.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--db", help="SQLite database to replay (opened read-only)")
+    src.add_argument("--synthetic", type=int, metavar="STEPS", help="generate STEPS buckets of Poisson flow")
+    p.add_argument("--guild", type=int, default=0, help="guild id to replay from --db")
+    p.add_argument("--archive-dir", default=ARCHIVE_DIR, help="cold archive to read older transactions from ('' to skip)")
+    p.add_argument("--bucket-minutes", type=int, default=60)
+    p.add_argument("--seed", type=int)
+    p.add_argument("--mean-buys", type=float, default=50.0)
+    p.add_argument("--mean-sells", type=float, default=45.0)
+    p.add_argument("--sensitivity", help="demand_sensitivity_bps values")
+    p.add_argument("--cap", help="daily_move_cap_bps values")
+    p.add_argument("--min-price", help="min_price values")
+    p.add_argument("--max-price", help="max_price values")
+    p.add_argument("--start-price", type=int, default=DEFAULT_STOCK_PRICE)
+    p.add_argument("--cashout-price", type=int, help="fixed aUEC per share paid on cash-out (default: market price)")
+    p.add_argument("--initial-shares", type=int, default=0)
+    p.add_argument("--top", type=int, default=10, help="rows to print, lowest peak exposure first")
+    p.add_argument("--csv", help="write every candidate's summary to this file")
+    p.add_argument("--paths", help="write price paths (.npy) to this file")
+    args = p.parse_args(argv)
+
+    bucket_seconds = max(1, args.bucket_minutes) * 60
+    if args.db:
+        flow = load_order_flow(args.db, args.guild, bucket_seconds, archive_dir=args.archive_dir or None)
+    else:
+        flow = synthetic_order_flow(
+            args.synthetic,
+            mean_buys=args.mean_buys,
+            mean_sells=args.mean_sells,
+            bucket_seconds=bucket_seconds,
+            seed=args.seed,
+        )
+    if not flow.starts:
+        print("No order flow to replay.")
+        return 1
+
+    grid = {
+        k: v
+        for k, v in (
+            ("demand_sensitivity_bps", _values(args.sensitivity)),
+            ("daily_move_cap_bps", _values(args.cap)),
+            ("min_price", _values(args.min_price)),
+            ("max_price", _values(args.max_price)),
+        )
+        if v
+    }
+    configs = config_grid(**grid)
+
+    t0 = time.perf_counter()
+    result = simulate(
+        flow,
+        configs,
+        start_price=args.start_price,
+        cashout_price=args.cashout_price,
+        initial_shares=args.initial_shares,
+    )
+    elapsed = time.perf_counter() - t0
+    rows = result.summary()
+    print(f"{len(rows):,} configs x {len(flow.starts):,} buckets in {elapsed:.2f}s")
+
+    rows.sort(key=lambda r: r["peak_exposure"])
+    cols = list(rows[0].keys())
+    print("  ".join(cols))
+    for r in rows[: max(0, args.top)]:
+        print("  ".join(f"{r[c]:,}" for c in cols))
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=cols)
+            w.writeheader()
+            w.writerows(rows)
+    if args.paths:
+        np.save(args.paths, result.prices)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+import gzip
+import json
+import os
+from pathlib import Path
+
+# Cold-storage layout: <root>/<table>/guild-<id>/<YYYY-MM>/<first_id>-<last_id>.jsonl.gz
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+# table -> (id column, timestamp column, archived columns)
+ARCHIVE_TABLES: dict[str, tuple[str, str, tuple[str, ...]]] = {
+    "transactions": (
+        "tx_id",
+        "created_at",
+        ("tx_id", "discord_id", "type", "amount", "shares_delta", "rep_delta", "reference", "guild_id", "created_at"),
+    ),
+    "ledger_entries": (
+        "entry_id",
+        "timestamp",
+        ("entry_id", "timestamp", "entry_type", "amount", "from_account", "to_account", "reference_type", "reference_id", "notes", "guild_id"),
+    ),
+    "stock_price_history": (
+        "id",
+        "created_at",
+        ("id", "guild_id", "price", "created_at"),
+    ),
+}
+
+
+def _guild_dir(root: str | os.PathLike, table: str, guild_id: int) -> Path:
+    return Path(root) / str(table) / f"guild-{int(guild_id)}"
+
+
+def write_segment(root: str | os.PathLike, table: str, guild_id: int, month: str, id_col: str, rows: list[dict]) -> Path:
+    """Write one archive segment atomically. Re-archiving the same id range overwrites it."""
+    first_id = min(int(r[id_col]) for r in rows)
+    last_id = max(int(r[id_col]) for r in rows)
+    folder = _guild_dir(root, table, guild_id) / str(month)
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / f"{first_id:012d}-{last_id:012d}.jsonl.gz"
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            for row in rows:
+                gz.write((json.dumps(row, separators=(",", ":")) + "\n").encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def list_segments(root: str | os.PathLike, table: str, guild_id: int, newest_first: bool = True) -> list[Path]:
+    folder = _guild_dir(root, table, guild_id)
+    if not folder.is_dir():
+        return []
+    # Zero-padded id ranges inside YYYY-MM folders sort chronologically as plain strings.
+    paths = sorted(folder.glob("*/*.jsonl.gz"), key=lambda p: (p.parent.name, p.name))
+    if newest_first:
+        paths.reverse()
+    return paths
+
+
+def read_segment(path: str | os.PathLike) -> list[dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
@@ -0,0 +1,219 @@
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from services.archive import ARCHIVE_DIR, list_segments, read_segment
+from services.market import DEFAULT_MARKET_CONFIG, DEFAULT_STOCK_PRICE, demand_price
+
+
+def _np():
+    # numpy is only needed offline; the bot itself runs without it.
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise RuntimeError("Backtesting needs numpy (pip install -r requirements-backtest.txt).") from e
+    return np
+
+
+def _epoch(ts: str) -> int:
+    return int(datetime.strptime(str(ts)[:19], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp())
+
+
+# =========================
+# ORDER FLOW
+# =========================
+@dataclass(frozen=True)
+class OrderFlow:
+    """Bucketed buy/sell units, oldest first. `starts` are bucket start times in epoch seconds."""
+
+    starts: list[int]
+    buys: list[int]
+    sells: list[int]
+    bucket_seconds: int
+
+
+def load_order_flow(
+    db_path: str,
+    guild_id: int,
+    bucket_seconds: int = 3600,
+    archive_dir: str | None = ARCHIVE_DIR,
+) -> OrderFlow:
+    """
+    Historical flow for one guild: buy_shares transactions as buys, cash-out requests as sells.
+
+    Transactions moved to cold storage are read back from the archive segments under
+    `archive_dir` (None skips them). Opens the database read-only. Trades are summed per bucket,
+    so the replay is an approximation of the live market, which reprices every trade tick.
+    """
+    bucket_seconds = max(60, int(bucket_seconds))
+    rows: list[tuple[str, int, int]] = []
+    archived_ids: set[int] = set()
+    if archive_dir:
+        for path in list_segments(archive_dir, "transactions", int(guild_id), newest_first=False):
+            for tx in read_segment(path):
+                # A crash between writing a segment and deleting its hot rows leaves both copies.
+                archived_ids.add(int(tx["tx_id"]))
+                if tx.get("type") == "buy_shares" and int(tx.get("shares_delta") or 0) > 0:
+                    rows.append((tx["created_at"], int(tx["shares_delta"]), 0))
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        hot = conn.execute(
+            """
+            SELECT tx_id, created_at, shares_delta, 0 FROM transactions
+            WHERE guild_id=? AND type='buy_shares' AND shares_delta > 0
+            UNION ALL
+            SELECT NULL, created_at, 0, shares FROM cashout_requests
+            WHERE guild_id=?
+            """,
+            (int(guild_id), int(guild_id)),
+        ).fetchall()
+    finally:
+        conn.close()
+    rows.extend(
+        (created_at, bought, sold)
+        for tx_id, created_at, bought, sold in hot
+        if tx_id is None or int(tx_id) not in archived_ids
+    )
+
+    buckets: dict[int, list[int]] = {}
+    for created_at, bought, sold in rows:
+        start = _epoch(created_at) // bucket_seconds * bucket_seconds
+        b = buckets.setdefault(start, [0, 0])
+        b[0] += int(bought)
+        b[1] += int(sold)
+    if not buckets:
+        return OrderFlow([], [], [], bucket_seconds)
+
+    # Quiet buckets still matter: the trailing 24h window drains through them.
+    first, last = min(buckets), max(buckets)
+    starts = list(range(first, last + bucket_seconds, bucket_seconds))
+    return OrderFlow(
+        starts,
+        [buckets.get(s, (0, 0))[0] for s in starts],
+        [buckets.get(s, (0, 0))[1] for s in starts],
+        bucket_seconds,
+    )
+
+
+def synthetic_order_flow(
+    steps: int,
+    *,
+    mean_buys: float = 50.0,
+    mean_sells: float = 45.0,
+    bucket_seconds: int = 3600,
+    seed: int | None = None,
+    start: int = 0,
+) -> OrderFlow:
+    """Poisson buy/sell units per bucket."""
+    np = _np()
+    rng = np.random.default_rng(seed)
+    bucket_seconds = max(60, int(bucket_seconds))
+    return OrderFlow(
+        [int(start) + i * bucket_seconds for i in range(int(steps))],
+        rng.poisson(mean_buys, int(steps)).tolist(),
+        rng.poisson(mean_sells, int(steps)).tolist(),
+        bucket_seconds,
+    )
+
+
+# =========================
+# SIMULATION
+# =========================
+CONFIG_KEYS = ("demand_sensitivity_bps", "daily_move_cap_bps", "min_price", "max_price")
+
+
+def config_grid(**values) -> dict:
+    """
+    Cartesian product of candidate values per stock_market_config key.
+    Missing keys use the live defaults. Returns {key: 1-D int64 array}, one entry per candidate.
+    """
+    np = _np()
+    axes = [np.asarray(values.get(k, [DEFAULT_MARKET_CONFIG[k]]), dtype=np.int64).ravel() for k in CONFIG_KEYS]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    return {k: m.ravel() for k, m in zip(CONFIG_KEYS, mesh)}
+
+
+@dataclass
+class BacktestResult:
+    """Per-candidate paths, shaped (candidates, steps)."""
+
+    configs: dict
+    prices: object
+    exposure: object
+
+    def summary(self) -> list[dict]:
+        np = _np()
+        peak = self.exposure.max(axis=1) if self.exposure.shape[1] else np.zeros(len(self.prices))
+        final = self.prices[:, -1] if self.prices.shape[1] else np.zeros(len(self.prices))
+        low = self.prices.min(axis=1) if self.prices.shape[1] else final
+        high = self.prices.max(axis=1) if self.prices.shape[1] else final
+        out = []
+        for i in range(len(self.prices)):
+            row = {k: int(v[i]) for k, v in self.configs.items()}
+            row.update(
+                final_price=int(final[i]),
+                low_price=int(low[i]),
+                high_price=int(high[i]),
+                peak_exposure=int(peak[i]),
+            )
+            out.append(row)
+        return out
+
+
+def simulate(
+    flow: OrderFlow,
+    configs: dict,
+    *,
+    start_price: int = DEFAULT_STOCK_PRICE,
+    cashout_price: int | None = None,
+    initial_shares: int = 0,
+) -> BacktestResult:
+    """
+    Replay flow through services.market.demand_price for every candidate at once.
+
+    Each bucket trades at the price it opens with and then reprices once from the trailing 24h
+    net flow. The live market reprices every trade tick, so this is a bucketed approximation;
+    smaller buckets track it more closely. The day open resets at UTC midnight. Exposure is what the
+    treasury would owe if every outstanding share were cashed out at the current price (or at
+    `cashout_price` when cash-outs pay a fixed rate), less the net aUEC it has taken in.
+    """
+    np = _np()
+    n = len(configs[CONFIG_KEYS[0]])
+    steps = len(flow.starts)
+    sensitivity = configs["demand_sensitivity_bps"]
+    cap = np.maximum(configs["daily_move_cap_bps"], 0)
+    min_price = configs["min_price"]
+    max_price = configs["max_price"]
+
+    buys = np.asarray(flow.buys, dtype=np.int64)
+    sells = np.asarray(flow.sells, dtype=np.int64)
+    window = max(1, 86400 // int(flow.bucket_seconds))
+    cum_net = np.concatenate(([0], np.cumsum(buys - sells)))
+    net_24h = cum_net[1:] - cum_net[np.maximum(np.arange(1, steps + 1) - window, 0)]
+    outstanding = int(initial_shares) + np.cumsum(buys - sells)
+    days = np.asarray(flow.starts, dtype=np.int64) // 86400
+
+    prices = np.empty((n, steps), dtype=np.int64)
+    exposure = np.empty((n, steps), dtype=np.int64)
+    price = np.full(n, int(start_price), dtype=np.int64)
+    day_open = price.copy()
+    cash = np.zeros(n, dtype=np.int64)
+    for t in range(steps):
+        if t and days[t] != days[t - 1]:
+            day_open = price.copy()
+        paid_out = cashout_price if cashout_price is not None else price
+        cash = cash + buys[t] * price - sells[t] * paid_out
+        price, _ = demand_price(
+            price,
+            day_open,
+            int(net_24h[t]),
+            sensitivity_bps=sensitivity,
+            cap_bps=cap,
+            min_price=min_price,
+            max_price=max_price,
+        )
+        prices[:, t] = price
+        mark = cashout_price if cashout_price is not None else price
+        exposure[:, t] = outstanding[t] * mark - cash
+    return BacktestResult(configs=configs, prices=prices, exposure=exposure)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import os
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except Exception:
+        return default
+
+
+# How long a card waits for further changes before its latest state is rendered and sent.
+CARD_UPDATE_MS = max(0, _env_int("CARD_UPDATE_MS", 750))
+
+# Returns the kwargs for PartialMessage.edit (embed/view/content), or None to skip the edit.
+CardRender = Callable[[], Awaitable[dict | None]]
+# Runs after the edit went out (e.g. to remember what the card now shows).
+CardSent = Callable[[], Awaitable[None]]
+
+
+class CardUpdater:
+    """
+    Coalesces edits to bot-owned cards, keyed by message id.
+
+    Each schedule() replaces the pending render for that message and the edit goes out once
+    the window closes, so a burst of state changes costs one render and one REST call. Edits
+    go through a partial messageable: no fetch first, and existing attachments (the org logo)
+    are kept instead of being uploaded again.
+    """
+
+    def __init__(self, bot, delay_ms: int | None = None):
+        self.bot = bot
+        self.delay = (CARD_UPDATE_MS if delay_ms is None else max(0, int(delay_ms))) / 1000
+        self._pending: dict[int, tuple[int, CardRender, CardSent | None]] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+
+    def schedule(self, channel_id: int, message_id: int, render: CardRender, after: CardSent | None = None) -> None:
+        message_id = int(message_id)
+        self._pending[message_id] = (int(channel_id), render, after)
+        if message_id not in self._tasks:
+            self._tasks[message_id] = asyncio.get_running_loop().create_task(self._send_after(message_id))
+
+    async def push(self, channel_id: int, message_id: int, render: CardRender, after: CardSent | None = None) -> bool:
+        """Send now, replacing anything queued for this message. Returns True if an edit went out."""
+        self._pending[int(message_id)] = (int(channel_id), render, after)
+        return await self.send(message_id)
+
+    async def _send_after(self, message_id: int) -> None:
+        await asyncio.sleep(self.delay)
+        self._tasks.pop(message_id, None)
+        await self.send(message_id)
+
+    async def send(self, message_id: int) -> bool:
+        """Render and send whatever is queued for this message now. Returns True if an edit went out."""
+        message_id = int(message_id)
+        lock = self._locks.setdefault(message_id, asyncio.Lock())
+        async with lock:
+            queued = self._pending.pop(message_id, None)
+            if queued is None:
+                return False
+            channel_id, render, after = queued
+            try:
+                kwargs = await render()
+                if kwargs is None:
+                    return False
+                channel = self.bot.get_partial_messageable(channel_id)
+                await channel.get_partial_message(message_id).edit(**kwargs)
+                if after is not None:
+                    await after()
+                return True
+            except Exception:
+                logger.debug("Card update failed for message=%s channel=%s", message_id, channel_id, exc_info=True)
+                return False
+            finally:
+                if message_id not in self._pending:
+                    self._locks.pop(message_id, None)
+
+    async def close(self) -> None:
+        """Send every queued card immediately (used on shutdown)."""
+        tasks, self._tasks = self._tasks, {}
+        for task in tasks.values():
+            if task is not asyncio.current_task():
+                task.cancel()
+        for message_id in list(self._pending):
+            await self.send(message_id)
@@ -0,0 +1,180 @@
+import asyncio
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+# Selectable /stock market chart windows, in seconds.
+CHART_RANGES: dict[str, int] = {
+    "24h": 86400,
+    "7d": 7 * 86400,
+    "30d": 30 * 86400,
+    "90d": 90 * 86400,
+}
+
+CHART_WIDTH = 640
+CHART_HEIGHT = 300
+
+_BG = (32, 41, 74)
+_GRID = (52, 63, 102)
+_LINE = (120, 190, 255)
+_UP = (72, 199, 116)
+_DOWN = (230, 85, 85)
+
+
+# =========================
+# PNG ENCODING (stdlib only; the bot ships without an imaging library)
+# =========================
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def encode_png(width: int, height: int, rgb: bytearray) -> bytes:
+    stride = width * 3
+    raw = bytearray()
+    for y in range(height):
+        raw.append(0)  # filter: none
+        raw += rgb[y * stride:(y + 1) * stride]
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(bytes(raw), 6))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+class _Canvas:
+    def __init__(self, width: int, height: int, bg: tuple[int, int, int]):
+        self.width = width
+        self.height = height
+        self.px = bytearray(bytes(bg) * (width * height))
+
+    def fill_rect(self, x0: int, y0: int, x1: int, y1: int, color: tuple[int, int, int]) -> None:
+        x0, x1 = max(0, min(x0, x1)), min(self.width - 1, max(x0, x1))
+        y0, y1 = max(0, min(y0, y1)), min(self.height - 1, max(y0, y1))
+        if x0 > x1 or y0 > y1:
+            return
+        row = bytes(color) * (x1 - x0 + 1)
+        for y in range(y0, y1 + 1):
+            start = (y * self.width + x0) * 3
+            self.px[start:start + len(row)] = row
+
+    def line(self, x0: int, y0: int, x1: int, y1: int, color: tuple[int, int, int]) -> None:
+        dx, dy = abs(x1 - x0), -abs(y1 - y0)
+        sx, sy = (1 if x0 < x1 else -1), (1 if y0 < y1 else -1)
+        err = dx + dy
+        c = bytes(color)
+        while True:
+            if 0 <= x0 < self.width and 0 <= y0 < self.height:
+                i = (y0 * self.width + x0) * 3
+                self.px[i:i + 3] = c
+            if x0 == x1 and y0 == y1:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x0 += sx
+            if e2 <= dx:
+                err += dx
+                y0 += sy
+
+
+def _scale(lo: int, hi: int, top: int, bottom: int) -> Callable[[float], int]:
+    span = max(1, hi - lo)
+    return lambda v: int(round(bottom - (v - lo) * (bottom - top) / span))
+
+
+def render_price_chart(
+    closes: list[int],
+    candles: list[tuple[int, int, int, int]],
+    width: int = CHART_WIDTH,
+    height: int = CHART_HEIGHT,
+) -> bytes:
+    """
+    PNG with a close-price sparkline on top and OHLC candles below.
+    closes: prices oldest first. candles: (open, high, low, close) oldest first.
+    """
+    canvas = _Canvas(width, height, _BG)
+    pad = 8
+    split = int(height * 0.4)
+
+    for y in (split, height - pad):
+        canvas.fill_rect(pad, y, width - pad, y, _GRID)
+
+    # Sparkline panel.
+    if closes:
+        lo, hi = min(closes), max(closes)
+        ys = _scale(lo, hi, pad, split - pad)
+        n = len(closes)
+        xs = [pad + (i * (width - 2 * pad - 1)) // max(1, n - 1) for i in range(n)]
+        if n == 1:
+            canvas.fill_rect(pad, ys(closes[0]), width - pad, ys(closes[0]), _LINE)
+        for i in range(1, n):
+            canvas.line(xs[i - 1], ys(closes[i - 1]), xs[i], ys(closes[i]), _LINE)
+
+    # Candle panel.
+    if candles:
+        lo = min(c[2] for c in candles)
+        hi = max(c[1] for c in candles)
+        ys = _scale(lo, hi, split + pad, height - 2 * pad)
+        slot = max(1, (width - 2 * pad) // len(candles))
+        body = max(1, slot * 3 // 5)
+        for i, (o, h, l, c) in enumerate(candles):
+            color = _UP if c >= o else _DOWN
+            cx = pad + i * slot + slot // 2
+            canvas.fill_rect(cx, ys(h), cx, ys(l), color)
+            canvas.fill_rect(cx - body // 2, ys(max(o, c)), cx - body // 2 + body - 1, ys(min(o, c)), color)
+
+    return encode_png(width, height, canvas.px)
+
+
+# =========================
+# RENDER CACHE
+# =========================
+class ChartCache:
+    """
+    LRU of rendered chart bytes keyed by (guild_id, range, price_version).
+
+    Concurrent requests for the same key share one render, so a burst of /stock market calls
+    renders at most once per price move.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max(1, int(max_entries))
+        self._items: OrderedDict[tuple, bytes] = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Future] = {}
+
+    def get(self, key: tuple) -> bytes | None:
+        data = self._items.get(key)
+        if data is not None:
+            self._items.move_to_end(key)
+        return data
+
+    def put(self, key: tuple, data: bytes) -> None:
+        self._items[key] = data
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    async def get_or_render(self, key: tuple, render: Callable[[], Awaitable[bytes]]) -> bytes:
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            data = await render()
+            self.put(key, data)
+            fut.set_result(data)
+            return data
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
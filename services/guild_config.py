@@ -0,0 +1,99 @@
+from typing import Any, Callable
+
+
+def parse_job_category_channel_map(raw: str) -> dict[str, int]:
+    """
+    JOB_CATEGORY_CHANNEL_MAP=mining:CHANNELID,event:CHANNELID
+    -> {"mining": 123..., "event": 456...}
+    """
+    out: dict[str, int] = {}
+    for part in (raw or "").split(","):
+        part = part.strip()
+        if not part or ":" not in part:
+            continue
+        k, v = part.split(":", 1)
+        k = k.strip().lower()
+        v = v.strip()
+        if k and v.isdigit():
+            out[k] = int(v)
+    return out
+
+
+def _parse_id(raw: str) -> int | None:
+    raw = (raw or "").strip()
+    return int(raw) if raw.isdigit() else None
+
+
+SETTING_PARSERS: dict[str, Callable[[str], Any]] = {
+    "JOB_CATEGORY_CHANNEL_MAP": parse_job_category_channel_map,
+}
+
+
+def parse_setting(key: str, raw: str | None) -> Any:
+    """Parsed form of one stored setting; None when it is blank or unusable."""
+    if raw is None or not str(raw).strip():
+        return None
+    parser = SETTING_PARSERS.get(key)
+    if parser is not None:
+        return parser(str(raw))
+    if key.endswith("_ID"):
+        return _parse_id(str(raw))
+    return str(raw)
+
+
+class GuildSettingsCache:
+    """
+    In-process copy of guild_settings, raw and parsed, kept current by the Database setters.
+    Once warmed from the table, a guild with no entry simply has no settings.
+    """
+
+    def __init__(self):
+        self._raw: dict[int, dict[str, str]] = {}
+        self._parsed: dict[int, dict[str, Any]] = {}
+        self.complete = False
+
+    def warm(self, rows) -> None:
+        self._raw.clear()
+        self._parsed.clear()
+        for gid, key, value in rows:
+            self._raw.setdefault(int(gid), {})[str(key)] = str(value)
+        self.complete = True
+
+    def has(self, guild_id: int) -> bool:
+        return self.complete or int(guild_id) in self._raw
+
+    def load(self, guild_id: int, values: dict[str, str]) -> None:
+        self._raw[int(guild_id)] = {str(k): str(v) for k, v in values.items()}
+        self._parsed.pop(int(guild_id), None)
+
+    def update(self, guild_id: int, updates: dict[str, str]) -> None:
+        gid = int(guild_id)
+        if gid not in self._raw and not self.complete:
+            # Unknown guild: the rest of its rows were never loaded, so let the next read fill it.
+            return
+        raw = self._raw.setdefault(gid, {})
+        parsed = self._parsed.get(gid)
+        for k, v in updates.items():
+            raw[str(k)] = str(v)
+            if parsed is not None:
+                parsed[str(k)] = parse_setting(str(k), str(v))
+
+    def raw(self, guild_id: int) -> dict[str, str]:
+        return dict(self._raw.get(int(guild_id), {}))
+
+    def parsed(self, guild_id: int, key: str) -> Any:
+        gid = int(guild_id)
+        parsed = self._parsed.setdefault(gid, {})
+        if key not in parsed:
+            parsed[key] = parse_setting(key, self._raw.get(gid, {}).get(key))
+        return parsed[key]
+
+    def invalidate(self, guild_id: int | None = None) -> None:
+        if guild_id is None:
+            self._raw.clear()
+            self._parsed.clear()
+            self.complete = False
+            return
+        self._raw.pop(int(guild_id), None)
+        self._parsed.pop(int(guild_id), None)
+        self.complete = False
@@ -0,0 +1,655 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except Exception:
+        return default
+
+
+DEFAULT_STOCK_PRICE = 100_000
+# Net units of buying/selling that move the price by one demand_sensitivity_bps step.
+DEMAND_STEP_UNITS = 100
+# Write-behind window for price/metrics rows (0 persists every change immediately).
+MARKET_FLUSH_MS = max(0, _env_int("MARKET_FLUSH_MS", 1000))
+
+# OHLC rollup resolutions in seconds: 1 minute, 1 hour, 1 day.
+CANDLE_RESOLUTIONS = (60, 3600, 86400)
+# Minute candles are only needed for short windows; older ones are pruned on flush.
+MINUTE_CANDLE_RETENTION_S = 2 * 86400
+# Trade flow that drives repricing is summed over this many trailing one-minute buckets.
+TRADE_FLOW_WINDOW_MINUTES = 1440
+
+DEFAULT_MARKET_CONFIG = {
+    "base_price": 100000,
+    "min_price": 50000,
+    "max_price": 250000,
+    "daily_move_cap_bps": 500,
+    "demand_sensitivity_bps": 50,
+}
+
+
+# =========================
+# PRICING (pure; scalars or numpy arrays)
+# =========================
+def _is_array(*values) -> bool:
+    return any(hasattr(v, "shape") for v in values)
+
+
+def _minimum(a, b):
+    if _is_array(a, b):
+        import numpy as np
+
+        return np.minimum(a, b)
+    return min(a, b)
+
+
+def _maximum(a, b):
+    if _is_array(a, b):
+        import numpy as np
+
+        return np.maximum(a, b)
+    return max(a, b)
+
+
+def _clamp(value, lower, upper):
+    return _minimum(_maximum(value, lower), upper)
+
+
+def _round_int(value):
+    if _is_array(value):
+        import numpy as np
+
+        return np.rint(value).astype(np.int64)
+    return int(round(value))
+
+
+def price_bounds(day_open, cap_bps, min_price, max_price):
+    """Allowed (lower, upper) price for the day: config floor/ceiling intersected with the daily move cap."""
+    day_floor = _round_int(day_open * (10000 - cap_bps) / 10000)
+    day_ceiling = _round_int(day_open * (10000 + cap_bps) / 10000)
+    lower = _maximum(min_price, day_floor)
+    upper = _minimum(max_price, day_ceiling)
+    # A misconfigured floor above the ceiling still yields a usable band.
+    return _minimum(lower, upper), _maximum(lower, upper)
+
+
+def demand_price(
+    current,
+    day_open,
+    net_units,
+    *,
+    sensitivity_bps,
+    cap_bps,
+    min_price,
+    max_price,
+    step_units: int = DEMAND_STEP_UNITS,
+):
+    """Next price from net trade flow. Returns (new_price, demand_bps); every argument may be an array."""
+    demand_bps = _clamp((net_units // step_units) * sensitivity_bps, -cap_bps, cap_bps)
+    raw_price = _round_int(current * (10000 + demand_bps) / 10000)
+    lower, upper = price_bounds(day_open, cap_bps, min_price, max_price)
+    return _clamp(raw_price, lower, upper), demand_bps
+
+
+def nudged_price(current, day_open, delta_bps, *, cap_bps, min_price, max_price):
+    """Price after a manual move of delta_bps, held to the same daily band as demand repricing."""
+    bounded = _clamp(delta_bps, -cap_bps, cap_bps)
+    raw_price = _round_int(current * (10000 + bounded) / 10000)
+    lower, upper = price_bounds(day_open, cap_bps, min_price, max_price)
+    return _clamp(raw_price, lower, upper)
+
+
+def _market_bands(cfg: dict) -> tuple[int, int, int]:
+    cap_bps = max(0, int(cfg.get("daily_move_cap_bps") or 500))
+    min_price = int(cfg.get("min_price") or 1)
+    max_price = int(cfg.get("max_price") or 10**12)
+    return cap_bps, min_price, max_price
+
+
+def _utc_now() -> str:
+    # Same text format as SQLite's datetime('now') so persisted rows sort and compare alike.
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def candle_resolution_for(seconds: int) -> int:
+    """Coarsest resolution that still resolves a window of this length to within a few percent."""
+    if seconds <= MINUTE_CANDLE_RETENTION_S:
+        return 60
+    if seconds <= 60 * 86400:
+        return 3600
+    return 86400
+
+
+def fold_candles(prices: list[tuple[int, str, int]], resolutions=CANDLE_RESOLUTIONS) -> list[tuple[int, int, int, int, int, int, int]]:
+    """
+    Fold (price, created_at, epoch) points, oldest first, into OHLC rows.
+    Returns (resolution, bucket_start, open, high, low, close, samples) per touched bucket.
+    """
+    buckets: dict[tuple[int, int], list[int]] = {}
+    for price, _, epoch in prices:
+        for res in resolutions:
+            key = (int(res), int(epoch) // int(res) * int(res))
+            c = buckets.get(key)
+            if c is None:
+                buckets[key] = [price, price, price, price, 1]
+            else:
+                c[1] = max(c[1], price)
+                c[2] = min(c[2], price)
+                c[3] = price
+                c[4] += 1
+    return [(res, start, *c) for (res, start), c in buckets.items()]
+
+
+def _now_minute() -> int:
+    return int(time.time()) // 60
+
+
+# =========================
+# IN-MEMORY STATE
+# =========================
+class TradeFlowWindow:
+    """
+    Ring buffer of per-minute buy/sell units with running totals over the trailing window.
+
+    Buckets that fall out of the window are subtracted as the clock advances, so reading the
+    24h totals never walks the buffer.
+    """
+
+    __slots__ = ("size", "minutes", "buys", "sells", "buys_total", "sells_total", "head", "dirty")
+
+    def __init__(self, size: int = TRADE_FLOW_WINDOW_MINUTES):
+        self.size = max(1, int(size))
+        self.minutes = [-1] * self.size
+        self.buys = [0] * self.size
+        self.sells = [0] * self.size
+        self.buys_total = 0
+        self.sells_total = 0
+        self.head = -1
+        # Minutes changed since the last flush.
+        self.dirty: set[int] = set()
+
+    @property
+    def net_total(self) -> int:
+        return self.buys_total - self.sells_total
+
+    def advance(self, minute: int) -> None:
+        """Move the window so it ends at `minute`, expiring buckets that are now too old."""
+        minute = int(minute)
+        if minute <= self.head:
+            return
+        for m in range(max(self.head + 1, minute - self.size + 1), minute + 1):
+            i = m % self.size
+            if self.minutes[i] != m:
+                self.buys_total -= self.buys[i]
+                self.sells_total -= self.sells[i]
+                self.buys[i] = 0
+                self.sells[i] = 0
+                self.minutes[i] = m
+        self.head = minute
+
+    def add(self, minute: int, buys: int = 0, sells: int = 0, *, mark_dirty: bool = True) -> None:
+        minute = int(minute)
+        self.advance(minute)
+        i = minute % self.size
+        if self.minutes[i] != minute:
+            # Older than the window.
+            return
+        self.buys[i] += int(buys)
+        self.sells[i] += int(sells)
+        self.buys_total += int(buys)
+        self.sells_total += int(sells)
+        if mark_dirty:
+            self.dirty.add(minute)
+
+    def bucket(self, minute: int) -> tuple[int, int] | None:
+        i = int(minute) % self.size
+        if self.minutes[i] != int(minute):
+            return None
+        return self.buys[i], self.sells[i]
+
+
+class GuildMarket:
+    """Config, price state and trade metrics for one guild, plus what still has to be persisted."""
+
+    __slots__ = ("guild_id", "config", "state", "metrics", "flow", "pending_prices", "dirty", "price_version")
+
+    def __init__(self, guild_id: int, config: dict, state: dict, metrics: dict, flow: TradeFlowWindow | None = None):
+        self.guild_id = int(guild_id)
+        self.config = config
+        self.state = state
+        self.metrics = metrics
+        self.flow = flow if flow is not None else TradeFlowWindow()
+        self.pending_prices: list[tuple[int, str, int]] = []
+        self.dirty = False
+        # Bumped whenever the live price moves; render caches key on it.
+        self.price_version = 0
+
+
+class MarketEngine:
+    """
+    Per-guild stock market held in memory.
+
+    Each guild loads once from the database. Trades and reprices then mutate memory only, and a
+    write-behind flush upserts stock_price_state/stock_trade_metrics/stock_trade_flow and appends
+    price history. The *_units_24h metrics are the trailing totals of the trade-flow window.
+    Config changes are rare admin actions and are written through immediately.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._guilds: dict[int, GuildMarket] = {}
+        self._loading: dict[int, asyncio.Future] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+
+    @staticmethod
+    def _gid(guild_id: int | None) -> int:
+        return int(guild_id) if guild_id is not None else 0
+
+    async def _get(self, guild_id: int | None) -> GuildMarket:
+        gid = self._gid(guild_id)
+        market = self._guilds.get(gid)
+        if market is not None:
+            return market
+        pending = self._loading.get(gid)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._loading[gid] = fut
+        try:
+            market = await self._load(gid)
+            self._guilds[gid] = market
+            fut.set_result(market)
+            return market
+        except BaseException as e:
+            fut.set_exception(e)
+            # Nobody may be waiting on the future; retrieve it so the loop does not log it.
+            fut.exception()
+            raise
+        finally:
+            self._loading.pop(gid, None)
+
+    async def _load(self, gid: int) -> GuildMarket:
+        cfg_row = await self.db._fetchone(
+            """
+            SELECT base_price, min_price, max_price, daily_move_cap_bps, demand_sensitivity_bps
+            FROM stock_market_config
+            WHERE guild_id=?
+            """,
+            (gid,),
+        )
+        state_row = await self.db._fetchone(
+            "SELECT current_price, day_open_price, day_high_price, day_low_price, updated_at FROM stock_price_state WHERE guild_id=?",
+            (gid,),
+        )
+        metrics_row = await self.db._fetchone(
+            "SELECT buys_units_24h, sells_units_24h, net_units_24h, last_trade_at, updated_at FROM stock_trade_metrics WHERE guild_id=?",
+            (gid,),
+        )
+
+        config = dict(DEFAULT_MARKET_CONFIG)
+        if cfg_row:
+            config.update(zip(DEFAULT_MARKET_CONFIG.keys(), (int(v) for v in cfg_row)))
+
+        if state_row:
+            state = {
+                "current_price": int(state_row[0]),
+                "day_open_price": int(state_row[1]),
+                "day_high_price": int(state_row[2]),
+                "day_low_price": int(state_row[3]),
+                "updated_at": str(state_row[4]) if state_row[4] is not None else None,
+            }
+        else:
+            state = {
+                "current_price": DEFAULT_STOCK_PRICE,
+                "day_open_price": DEFAULT_STOCK_PRICE,
+                "day_high_price": DEFAULT_STOCK_PRICE,
+                "day_low_price": DEFAULT_STOCK_PRICE,
+                "updated_at": None,
+            }
+
+        if metrics_row:
+            metrics = {
+                "buys_units_24h": int(metrics_row[0]),
+                "sells_units_24h": int(metrics_row[1]),
+                "net_units_24h": int(metrics_row[2]),
+                "last_trade_at": str(metrics_row[3]) if metrics_row[3] is not None else None,
+                "updated_at": str(metrics_row[4]) if metrics_row[4] is not None else None,
+            }
+        else:
+            metrics = {"buys_units_24h": 0, "sells_units_24h": 0, "net_units_24h": 0, "last_trade_at": None, "updated_at": None}
+
+        now_minute = _now_minute()
+        flow = TradeFlowWindow()
+        flow.advance(now_minute)
+        flow_rows = await self.db._fetchall(
+            "SELECT minute, buys, sells FROM stock_trade_flow WHERE guild_id=? AND minute > ? ORDER BY minute",
+            (gid, now_minute - flow.size),
+        )
+        for minute, buys, sells in flow_rows:
+            flow.add(int(minute), int(buys), int(sells), mark_dirty=False)
+
+        market = GuildMarket(gid, config, state, metrics, flow)
+        self._sync_flow_metrics(market)
+        return market
+
+    @staticmethod
+    def _sync_flow_metrics(market: GuildMarket) -> None:
+        flow = market.flow
+        flow.advance(_now_minute())
+        m = market.metrics
+        m["buys_units_24h"] = int(flow.buys_total)
+        m["sells_units_24h"] = int(flow.sells_total)
+        m["net_units_24h"] = int(flow.net_total)
+
+    def cached_price(self, guild_id: int | None) -> int | None:
+        """Live price if the guild is already loaded, without touching the database."""
+        market = self._guilds.get(self._gid(guild_id))
+        return int(market.state["current_price"]) if market is not None else None
+
+    # ---------- reads ----------
+    async def price_version(self, guild_id: int | None = None) -> int:
+        return int((await self._get(guild_id)).price_version)
+
+    async def config(self, guild_id: int | None = None) -> dict:
+        return dict((await self._get(guild_id)).config)
+
+    async def state(self, guild_id: int | None = None) -> dict:
+        return dict((await self._get(guild_id)).state)
+
+    async def metrics(self, guild_id: int | None = None) -> dict:
+        market = await self._get(guild_id)
+        self._sync_flow_metrics(market)
+        return dict(market.metrics)
+
+    async def unsaved_prices(self, guild_id: int | None = None) -> list[tuple[int, str, int]]:
+        """Price points not flushed yet as (price, created_at, epoch), oldest first."""
+        return list((await self._get(guild_id)).pending_prices)
+
+    # ---------- writes ----------
+    async def set_config(self, guild_id: int | None = None, **updates) -> dict:
+        market = await self._get(guild_id)
+        cfg = dict(market.config)
+        for key, value in updates.items():
+            if value is not None:
+                cfg[key] = int(value)
+        if int(cfg["min_price"]) > int(cfg["max_price"]):
+            raise ValueError("min_price cannot be greater than max_price")
+        async with self.db._transaction():
+            await self.db.conn.execute(
+                """
+                INSERT INTO stock_market_config(guild_id, base_price, min_price, max_price, daily_move_cap_bps, demand_sensitivity_bps, updated_at)
+                VALUES(?,?,?,?,?,?,datetime('now'))
+                ON CONFLICT(guild_id) DO UPDATE SET
+                  base_price=excluded.base_price,
+                  min_price=excluded.min_price,
+                  max_price=excluded.max_price,
+                  daily_move_cap_bps=excluded.daily_move_cap_bps,
+                  demand_sensitivity_bps=excluded.demand_sensitivity_bps,
+                  updated_at=excluded.updated_at
+                """,
+                (
+                    market.guild_id,
+                    int(cfg["base_price"]),
+                    int(cfg["min_price"]),
+                    int(cfg["max_price"]),
+                    int(cfg["daily_move_cap_bps"]),
+                    int(cfg["demand_sensitivity_bps"]),
+                ),
+            )
+        market.config = cfg
+        return dict(cfg)
+
+    async def set_price(
+        self,
+        guild_id: int | None = None,
+        *,
+        current_price: int,
+        day_open_price: int | None = None,
+        day_high_price: int | None = None,
+        day_low_price: int | None = None,
+    ) -> None:
+        market = await self._get(guild_id)
+        self._apply_price(market, int(current_price), day_open_price, day_high_price, day_low_price)
+
+    def _apply_price(self, market: GuildMarket, current: int, day_open=None, day_high=None, day_low=None) -> None:
+        state = market.state
+        now = _utc_now()
+        if int(state["current_price"]) != int(current):
+            market.price_version += 1
+        state["current_price"] = int(current)
+        if day_open is not None:
+            state["day_open_price"] = int(day_open)
+        state["day_high_price"] = int(day_high) if day_high is not None else max(int(state["day_high_price"]), int(current))
+        state["day_low_price"] = int(day_low) if day_low is not None else min(int(state["day_low_price"]), int(current))
+        state["updated_at"] = now
+        market.pending_prices.append((int(current), now, int(time.time())))
+        self._mark_dirty(market)
+
+    async def record_trade(self, side: str, units: int, guild_id: int | None = None) -> None:
+        qty = max(0, int(units))
+        if qty <= 0:
+            return
+        market = await self._get(guild_id)
+        side_norm = str(side).strip().lower()
+        buy_add = qty if side_norm == "buy" else 0
+        sell_add = qty if side_norm == "sell" else 0
+        now = _utc_now()
+        market.flow.add(_now_minute(), buy_add, sell_add)
+        self._sync_flow_metrics(market)
+        m = market.metrics
+        m["last_trade_at"] = now
+        m["updated_at"] = now
+        self._mark_dirty(market)
+
+    async def live_price(self, guild_id: int | None = None) -> int:
+        """Current price, seeding it from base_price when the guild has never been priced."""
+        market = await self._get(guild_id)
+        price = int(market.state.get("current_price") or 0)
+        if price > 0:
+            return price
+        base = int(market.config.get("base_price") or DEFAULT_STOCK_PRICE)
+        self._apply_price(market, base, base, base, base)
+        return base
+
+    async def reprice(self, guild_id: int | None = None) -> tuple[int, int, int]:
+        """Reprice from net trade flow. Returns (before, after, demand_bps)."""
+        market = await self._get(guild_id)
+        cfg, state = market.config, market.state
+        current = int(state.get("current_price") or cfg.get("base_price") or DEFAULT_STOCK_PRICE)
+        day_open = int(state.get("day_open_price") or current)
+        cap_bps, min_price, max_price = _market_bands(cfg)
+        self._sync_flow_metrics(market)
+        new_price, demand_bps = demand_price(
+            current,
+            day_open,
+            int(market.flow.net_total),
+            sensitivity_bps=int(cfg.get("demand_sensitivity_bps") or 50),
+            cap_bps=cap_bps,
+            min_price=min_price,
+            max_price=max_price,
+        )
+        self._apply_price(market, int(new_price))
+        return int(current), int(new_price), int(demand_bps)
+
+    async def nudge(self, delta_bps: int, guild_id: int | None = None) -> tuple[int, int]:
+        market = await self._get(guild_id)
+        cfg, state = market.config, market.state
+        current = int(state.get("current_price") or cfg.get("base_price") or DEFAULT_STOCK_PRICE)
+        day_open = int(state.get("day_open_price") or current)
+        cap_bps, min_price, max_price = _market_bands(cfg)
+        new_price = nudged_price(current, day_open, int(delta_bps), cap_bps=cap_bps, min_price=min_price, max_price=max_price)
+        self._apply_price(market, int(new_price))
+        return int(current), int(new_price)
+
+    async def set_price_bounded(self, price: int, guild_id: int | None = None) -> tuple[int, int]:
+        """Set the price directly, held to config limits and the daily move cap."""
+        market = await self._get(guild_id)
+        cfg, state = market.config, market.state
+        cap_bps, min_price, max_price = _market_bands(cfg)
+        bounded = _clamp(int(price), min_price, max_price)
+        day_open = int(state.get("day_open_price") or bounded)
+        lower, upper = price_bounds(day_open, cap_bps, min_price, max_price)
+        bounded = int(_clamp(bounded, lower, upper))
+        old = int(state.get("current_price") or bounded)
+        self._apply_price(market, bounded)
+        return old, bounded
+
+    # ---------- write-behind ----------
+    def _mark_dirty(self, market: GuildMarket) -> None:
+        market.dirty = True
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_after(MARKET_FLUSH_MS / 1000))
+
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Market state flush failed")
+
+    async def flush(self, guild_id: int | None = None) -> None:
+        """Persist dirty market state. Pass guild_id to flush only that guild."""
+        async with self._flush_lock:
+            if guild_id is not None:
+                markets = [m for m in (self._guilds.get(self._gid(guild_id)),) if m is not None and m.dirty]
+            else:
+                markets = [m for m in self._guilds.values() if m.dirty]
+            if not markets or self.db.conn is None:
+                return
+
+            # Take the snapshot only once the transaction is open, so a failed BEGIN leaves the
+            # dirty state untouched for the next flush.
+            await self.db._begin()
+            snapshot = []
+            try:
+                for market in markets:
+                    self._sync_flow_metrics(market)
+                    flow = market.flow
+                    buckets = [(m, *b) for m in sorted(flow.dirty) if (b := flow.bucket(m)) is not None]
+                    snapshot.append((market, dict(market.state), dict(market.metrics), market.pending_prices, buckets, flow.dirty))
+                    market.pending_prices = []
+                    flow.dirty = set()
+                    market.dirty = False
+                for market, state, metrics, prices, buckets, _ in snapshot:
+                    await self._persist(market.guild_id, state, metrics, prices, buckets, market.flow.head - market.flow.size)
+                await self.db._commit()
+            except Exception:
+                await self.db._rollback()
+                # Put the unsaved changes back so the next flush retries them.
+                for market, _, _, prices, _, flow_dirty in snapshot:
+                    market.pending_prices = prices + market.pending_prices
+                    market.flow.dirty |= flow_dirty
+                    market.dirty = True
+                raise
+
+    async def _persist(
+        self,
+        gid: int,
+        state: dict,
+        metrics: dict,
+        prices: list[tuple[int, str, int]],
+        flow_buckets: list[tuple[int, int, int]] = (),
+        flow_expired_before: int | None = None,
+    ) -> None:
+        conn = self.db.conn
+        await conn.execute(
+            """
+            INSERT INTO stock_price_state(guild_id, current_price, day_open_price, day_high_price, day_low_price, updated_at)
+            VALUES(?,?,?,?,?,COALESCE(?, datetime('now')))
+            ON CONFLICT(guild_id) DO UPDATE SET
+              current_price=excluded.current_price,
+              day_open_price=excluded.day_open_price,
+              day_high_price=excluded.day_high_price,
+              day_low_price=excluded.day_low_price,
+              updated_at=excluded.updated_at
+            """,
+            (
+                gid,
+                int(state["current_price"]),
+                int(state["day_open_price"]),
+                int(state["day_high_price"]),
+                int(state["day_low_price"]),
+                state.get("updated_at"),
+            ),
+        )
+        await conn.execute(
+            """
+            INSERT INTO stock_trade_metrics(guild_id, buys_units_24h, sells_units_24h, net_units_24h, last_trade_at, updated_at)
+            VALUES(?,?,?,?,?,COALESCE(?, datetime('now')))
+            ON CONFLICT(guild_id) DO UPDATE SET
+              buys_units_24h=excluded.buys_units_24h,
+              sells_units_24h=excluded.sells_units_24h,
+              net_units_24h=excluded.net_units_24h,
+              last_trade_at=excluded.last_trade_at,
+              updated_at=excluded.updated_at
+            """,
+            (
+                gid,
+                int(metrics["buys_units_24h"]),
+                int(metrics["sells_units_24h"]),
+                int(metrics["net_units_24h"]),
+                metrics.get("last_trade_at"),
+                metrics.get("updated_at"),
+            ),
+        )
+        if prices:
+            await conn.executemany(
+                "INSERT INTO stock_price_history(guild_id, price, created_at) VALUES(?,?,?)",
+                [(gid, int(price), str(ts)) for price, ts, _ in prices],
+            )
+            await conn.executemany(
+                """
+                INSERT INTO stock_candles(guild_id, resolution, bucket_start, open, high, low, close, samples)
+                VALUES(?,?,?,?,?,?,?,?)
+                ON CONFLICT(guild_id, resolution, bucket_start) DO UPDATE SET
+                  high=MAX(high, excluded.high),
+                  low=MIN(low, excluded.low),
+                  close=excluded.close,
+                  samples=samples + excluded.samples
+                """,
+                [(gid, *candle) for candle in fold_candles(prices)],
+            )
+            await conn.execute(
+                "DELETE FROM stock_candles WHERE guild_id=? AND resolution=60 AND bucket_start < ?",
+                (gid, int(prices[-1][2]) - MINUTE_CANDLE_RETENTION_S),
+            )
+        if flow_buckets:
+            await conn.executemany(
+                """
+                INSERT INTO stock_trade_flow(guild_id, minute, buys, sells)
+                VALUES(?,?,?,?)
+                ON CONFLICT(guild_id, minute) DO UPDATE SET
+                  buys=excluded.buys,
+                  sells=excluded.sells
+                """,
+                [(gid, int(minute), int(buys), int(sells)) for minute, buys, sells in flow_buckets],
+            )
+            if flow_expired_before is not None:
+                await conn.execute(
+                    "DELETE FROM stock_trade_flow WHERE guild_id=? AND minute <= ?",
+                    (gid, int(flow_expired_before)),
+                )
+
+    async def close(self) -> None:
+        task, self._flush_task = self._flush_task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        await self.flush()
+
+    def invalidate(self, guild_id: int | None = None) -> None:
+        """Drop loaded state so the next read reloads it; unflushed changes are discarded."""
+        if guild_id is None:
+            self._guilds.clear()
+        else:
+            self._guilds.pop(self._gid(guild_id), None)
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except Exception:
+        return default
+
+
+# How long RSVP add/remove events for one job are gathered before they are written together.
+RSVP_FLUSH_MS = max(0, _env_int("RSVP_FLUSH_MS", 1000))
+# Minimum gap between card refreshes caused by RSVPs for the same job.
+RSVP_CARD_REFRESH_S = max(0, _env_int("RSVP_CARD_REFRESH_S", 10))
+
+
+class RsvpAggregator:
+    """
+    Buffers scheduled-event RSVP add/remove events per job.
+
+    Within one flush window the last event per member wins, and the batch is written with a
+    single Database.apply_attendance_changes transaction. The card refresh callback runs at
+    most once per refresh interval per job; a refresh requested inside the interval is
+    deferred to its end and then renders whatever the attendance is by then.
+    """
+
+    def __init__(
+        self,
+        db,
+        refresh: Callable[[int], Awaitable[None]],
+        flush_ms: int | None = None,
+        refresh_s: float | None = None,
+    ):
+        self.db = db
+        self._refresh = refresh
+        self.flush_delay = (RSVP_FLUSH_MS if flush_ms is None else max(0, int(flush_ms))) / 1000
+        self.refresh_interval = float(RSVP_CARD_REFRESH_S if refresh_s is None else max(0.0, float(refresh_s)))
+        self._pending: dict[int, dict[int, bool]] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._last_refresh: dict[int, float] = {}
+        self._refresh_tasks: dict[int, asyncio.Task] = {}
+
+    async def submit(self, event_id: int, user_id: int, joined: bool) -> bool:
+        """Queue one RSVP change. Returns False when the event is not linked to a job."""
+        job_id = await self.db.get_job_id_by_event(int(event_id))
+        if not job_id:
+            return False
+        job_id = int(job_id)
+        self._pending.setdefault(job_id, {})[int(user_id)] = bool(joined)
+        if job_id not in self._tasks:
+            self._tasks[job_id] = asyncio.get_running_loop().create_task(self._flush_after(job_id))
+        return True
+
+    async def _flush_after(self, job_id: int) -> None:
+        await asyncio.sleep(self.flush_delay)
+        self._tasks.pop(job_id, None)
+        await self.flush(job_id)
+
+    async def flush(self, job_id: int) -> dict | None:
+        """Write whatever is queued for this job now."""
+        lock = self._locks.setdefault(int(job_id), asyncio.Lock())
+        async with lock:
+            changes = self._pending.pop(int(job_id), None)
+            if not changes:
+                return None
+            added = [uid for uid, joined in changes.items() if joined]
+            removed = [uid for uid, joined in changes.items() if not joined]
+            try:
+                result = await self.db.apply_attendance_changes(int(job_id), added, removed)
+            except Exception:
+                logger.exception("RSVP flush failed for job %s (%s changes requeued)", job_id, len(changes))
+                # Put the batch back for the next flush; RSVPs that arrived meanwhile are newer and win.
+                pending = self._pending.setdefault(int(job_id), {})
+                for uid, joined in changes.items():
+                    pending.setdefault(uid, joined)
+                if int(job_id) not in self._tasks:
+                    self._tasks[int(job_id)] = asyncio.get_running_loop().create_task(self._flush_after(int(job_id)))
+                return None
+        if result["added"] or result["removed"]:
+            self._request_refresh(int(job_id))
+        return result
+
+    def _request_refresh(self, job_id: int) -> None:
+        if job_id in self._refresh_tasks:
+            return
+        last = self._last_refresh.get(job_id)
+        wait = 0.0 if last is None else max(0.0, last + self.refresh_interval - time.monotonic())
+        self._refresh_tasks[job_id] = asyncio.get_running_loop().create_task(self._refresh_after(job_id, wait))
+
+    async def _refresh_after(self, job_id: int, delay: float) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        self._refresh_tasks.pop(job_id, None)
+        self._last_refresh[job_id] = time.monotonic()
+        try:
+            await self._refresh(job_id)
+        except Exception:
+            logger.debug("RSVP card refresh failed for job %s", job_id, exc_info=True)
+
+    async def close(self) -> None:
+        """Write every queued RSVP immediately and drop deferred refreshes (used on shutdown)."""
+        tasks, self._tasks = self._tasks, {}
+        refreshes, self._refresh_tasks = self._refresh_tasks, {}
+        for task in [*tasks.values(), *refreshes.values()]:
+            if task is not asyncio.current_task():
+                task.cancel()
+        for job_id in list(self._pending):
+            await self.flush(job_id)
+        # A failed flush requeues itself and flushing may queue refreshes; neither runs during shutdown.
+        for task in [*self._tasks.values(), *self._refresh_tasks.values()]:
+            task.cancel()
+        self._tasks.clear()
+        self._refresh_tasks.clear()
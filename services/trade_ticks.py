@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)) or default)
+    except Exception:
+        return default
+
+
+# How long a tick gathers /stock buy and /stock sell intents before settling them together.
+TRADE_TICK_MS = max(0, _env_int("TRADE_TICK_MS", 250))
+
+
+@dataclass(frozen=True)
+class TradeFill:
+    """Outcome of one trade intent. `error` is set when the intent was rejected."""
+
+    discord_id: int
+    side: str
+    units: int
+    price: int
+    cost: int
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class _Intent:
+    discord_id: int
+    side: str
+    units: int
+    reference: str | None
+    future: asyncio.Future
+
+
+class TradeTicker:
+    """
+    Batches trade intents per guild into short ticks.
+
+    Every intent that arrives within one tick window settles in a single transaction at the
+    live price taken when the tick fires, then the trade flow is recorded and the market is
+    repriced once for the whole tick. Each submitter awaits its own fill.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._pending: dict[int | None, list[_Intent]] = {}
+        self._tasks: dict[int | None, asyncio.Task] = {}
+        self._locks: dict[int | None, asyncio.Lock] = {}
+
+    async def submit(
+        self,
+        discord_id: int,
+        side: str,
+        units: int,
+        guild_id: int | None = None,
+        reference: str | None = None,
+    ) -> TradeFill:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(guild_id, []).append(
+            _Intent(int(discord_id), str(side).strip().lower(), int(units), reference, fut)
+        )
+        if guild_id not in self._tasks:
+            self._tasks[guild_id] = asyncio.get_running_loop().create_task(self._tick_after(guild_id, TRADE_TICK_MS / 1000))
+        return await fut
+
+    async def _tick_after(self, guild_id: int | None, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._tasks.pop(guild_id, None)
+        await self.settle(guild_id)
+
+    async def settle(self, guild_id: int | None) -> None:
+        """Settle whatever is queued for this guild now."""
+        lock = self._locks.setdefault(guild_id, asyncio.Lock())
+        async with lock:
+            intents = self._pending.pop(guild_id, [])
+            if not intents:
+                return
+            try:
+                price = await self.db.market.live_price(guild_id)
+                fills = await self.db.settle_trade_batch(
+                    guild_id,
+                    price,
+                    [(i.discord_id, i.side, i.units, i.reference) for i in intents],
+                )
+            except Exception as e:
+                logger.exception("Trade tick failed for guild %s", guild_id)
+                for intent in intents:
+                    if not intent.future.done():
+                        intent.future.set_exception(e)
+                return
+            # The batch is committed, so submitters get their fills even if the market update fails.
+            for intent, fill in zip(intents, fills):
+                if not intent.future.done():
+                    intent.future.set_result(fill)
+
+            bought = sum(f.units for f in fills if f.ok and f.side == "buy")
+            sold = sum(f.units for f in fills if f.ok and f.side == "sell")
+            try:
+                if bought:
+                    await self.db.market.record_trade("buy", bought, guild_id=guild_id)
+                if sold:
+                    await self.db.market.record_trade("sell", sold, guild_id=guild_id)
+                if bought or sold:
+                    await self.db.market.reprice(guild_id)
+            except Exception:
+                logger.exception("Market update after trade tick failed for guild %s", guild_id)
+
+    async def close(self) -> None:
+        """Settle every queued intent immediately (used on shutdown)."""
+        tasks, self._tasks = self._tasks, {}
+        for task in tasks.values():
+            if task is not asyncio.current_task():
+                task.cancel()
+        for guild_id in list(self._pending):
+            await self.settle(guild_id)
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from services.db import Database
+
+
+class AccountSnapshotTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-snapshot-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def test_snapshot_matches_individual_getters(self):
+        gid, uid = 1, 2
+        await self.db.set_treasury(1_000_000, guild_id=gid)
+        await self.db.set_stock_price_state(guild_id=gid, current_price=120_000)
+        await self.db.add_balance(uid, 900_000, "seed", guild_id=gid)
+        await self.db.buy_shares(uid, shares_delta=5, cost=600_000, guild_id=gid)
+        await self.db.add_rep(uid, 250, guild_id=gid)
+        await self.db.lock_shares(uid, 2, guild_id=gid)
+        await self.db.create_cashout_request(gid, 1, 1, uid, 2)
+
+        snap = await self.db.get_account_snapshot(uid, guild_id=gid, per_level=100)
+        self.assertEqual(snap.balance, await self.db.get_balance(uid, guild_id=gid))
+        self.assertEqual(snap.shares, 5)
+        self.assertEqual(snap.shares_locked, 2)
+        self.assertEqual(snap.shares_available, await self.db.get_shares_available(uid, guild_id=gid))
+        self.assertEqual(snap.rep, 250)
+        self.assertEqual(snap.level, 2)
+        self.assertEqual(snap.pending_sells, 1)
+        self.assertEqual(
+            (snap.pending_bonds_count, snap.pending_bonds_total),
+            await self.db.get_user_outstanding_bonds(uid, guild_id=gid),
+        )
+        self.assertEqual(snap.live_price, 120_000)
+        self.assertEqual(snap.estimated_stock_value, 5 * 120_000)
+
+    async def test_unknown_member_gets_zeroes_without_writes(self):
+        changes_before = self.db.conn.total_changes
+        snap = await self.db.get_account_snapshot(9, guild_id=3)
+        self.assertEqual((snap.balance, snap.shares, snap.rep, snap.pending_sells), (0, 0, 0, 0))
+        self.assertEqual(snap.live_price, 100_000)
+        self.assertEqual(self.db.conn.total_changes, changes_before)
+
+
+if __name__ == "__main__":
+    unittest.main()
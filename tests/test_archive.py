@@ -0,0 +1,76 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from services.db import Database
+
+
+class ArchiveTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-archive-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.archive_dir = tempfile.mkdtemp(prefix="orgbot-archive-test-")
+        self.db = Database(path=self.tmp.name, archive_dir=self.archive_dir)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+        shutil.rmtree(self.archive_dir, ignore_errors=True)
+
+    def _backdate(self, sql: str):
+        with sqlite3.connect(self.tmp.name) as raw:
+            raw.execute(sql)
+
+    def _count(self, table: str) -> int:
+        with sqlite3.connect(self.tmp.name) as raw:
+            return int(raw.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0])
+
+    async def test_old_transactions_move_to_archive_and_stay_queryable(self):
+        gid = 1
+        await self.db.add_balance(2, 100, "seed", guild_id=gid)
+        await self.db.add_balance(2, 50, "payout", reference="job:1", guild_id=gid)
+        await self.db.add_balance(3, 75, "payout", guild_id=gid)
+        await self.db.flush()
+        self._backdate("UPDATE transactions SET created_at='2020-01-15 12:00:00' WHERE tx_id <= 2")
+
+        moved = await self.db.archive_cold_rows(older_than_days=90)
+        self.assertEqual(moved["transactions"], 2)
+        self.assertEqual(self._count("transactions"), 1)
+
+        hot = await self.db.list_transactions(discord_id=2, guild_id=gid)
+        self.assertEqual(hot, [])
+        rows = await self.db.list_transactions(discord_id=2, guild_id=gid, include_archive=True)
+        self.assertEqual([r[0] for r in rows], [2, 1])
+        self.assertEqual(rows[0][2], "payout")
+
+        # Re-running finds nothing new and does not duplicate archived rows.
+        again = await self.db.archive_cold_rows(older_than_days=90)
+        self.assertEqual(again["transactions"], 0)
+        rows = await self.db.list_transactions(guild_id=gid, include_archive=True)
+        self.assertEqual([r[0] for r in rows], [3, 2, 1])
+
+    async def test_ledger_entries_after_latest_checkpoint_stay_hot(self):
+        gid = 1
+        await self.db.set_treasury(1_000, guild_id=gid)
+        await self.db.add_balance(2, 500, "seed", guild_id=gid)
+        await self.db.buy_shares(2, shares_delta=1, cost=100, guild_id=gid)
+        self._backdate("UPDATE ledger_entries SET timestamp='2020-01-15 12:00:00'")
+
+        moved = await self.db.archive_cold_rows(older_than_days=90)
+        self.assertEqual(moved["ledger_entries"], 1)
+
+        _, ledger, _, _ = await self.db.get_ledger_reconcile(guild_id=gid)
+        self.assertEqual(ledger, 1_100)
+
+
+if __name__ == "__main__":
+    unittest.main()
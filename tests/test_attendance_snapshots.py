@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from services.db import Database, _pack_member_ids, _unpack_member_ids
+
+
+class AttendanceSnapshotTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-snapshot-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.job_id = await self.db.create_job(1, 1, "Op", "desc", 100, created_by=1, category="event", guild_id=1)
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    def test_member_ids_round_trip_full_snowflakes(self):
+        ids = [1, 2**63 - 1, 1_234_567_890_123_456_789]
+        blob = _pack_member_ids(ids)
+        self.assertEqual(len(blob), 8 * len(ids))
+        self.assertEqual(_unpack_member_ids(blob), ids)
+        self.assertEqual(_unpack_member_ids(None), [])
+
+    async def test_versions_and_diff(self):
+        job = self.job_id
+        self.assertEqual(await self.db.get_job_attendance_snapshot(job), [])
+
+        self.assertEqual(await self.db.set_job_attendance_snapshot(job, [30, 10, 20, 10]), (1, True))
+        self.assertEqual(await self.db.set_job_attendance_snapshot(job, [30, 10, 20]), (1, False))
+        self.assertEqual(await self.db.set_job_attendance_snapshot(job, [30, 40]), (2, True))
+
+        self.assertEqual(await self.db.get_job_attendance_snapshot(job), [30, 40])
+        self.assertEqual(await self.db.get_job_attendance_snapshot(job, version=1), [30, 10, 20])
+        self.assertEqual([(v, n) for v, n, _ in await self.db.list_job_attendance_snapshots(job)], [(2, 2), (1, 3)])
+
+        self.assertEqual(
+            await self.db.diff_job_attendance_snapshots(job, 1),
+            {"added": [40], "removed": [10, 20]},
+        )
+        self.assertEqual(
+            await self.db.diff_job_attendance_snapshots(job, 0, 1),
+            {"added": [30, 10, 20], "removed": []},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from services.db import Database
+
+
+class AttendanceSyncTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-attendance-sync-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.job_id = await self.db.create_job(1, 1, "Op", "desc", 100, created_by=1, category="event", guild_id=1)
+        await self.db.link_event_job(555, self.job_id)
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def _attendees(self) -> set[int]:
+        return {int(r[0]) for r in await self.db.list_event_attendees(self.job_id)}
+
+    async def test_bulk_sync_applies_diff_and_records_watermark(self):
+        job = self.job_id
+        self.assertEqual(await self.db.get_event_id_by_job(job), 555)
+        for uid in (1, 2, 3):
+            await self.db.add_event_attendee(job, uid)
+        await self.db.flush()
+
+        subscribers = set(range(2, 202))
+        result = await self.db.sync_event_attendance(job, subscribers, event_id=555, subscriber_count=200)
+        self.assertEqual(result, {"locked": False, "added": 198, "removed": 1, "total": 200})
+        self.assertEqual(await self._attendees(), subscribers)
+
+        self.assertTrue(await self.db.is_event_attendance_synced(job, 555, sorted(subscribers, reverse=True)))
+        self.assertFalse(await self.db.is_event_attendance_synced(job, 555, subscribers | {202}))
+        self.assertFalse(await self.db.is_event_attendance_synced(job, 556, subscribers))
+        # Same count, different members: one left and another joined.
+        self.assertFalse(await self.db.is_event_attendance_synced(job, 555, (subscribers - {2}) | {202}))
+
+        # A local RSVP change since the sync invalidates the watermark.
+        await self.db.apply_attendance_changes(job, [], [2])
+        self.assertFalse(await self.db.is_event_attendance_synced(job, 555, subscribers))
+
+    async def test_locked_attendance_is_left_alone(self):
+        job = self.job_id
+        await self.db.add_event_attendee(job, 1)
+        await self.db.set_job_attendance_lock(job, True)
+
+        result = await self.db.sync_event_attendance(job, {2, 3}, event_id=555, subscriber_count=2)
+        self.assertTrue(result["locked"])
+        self.assertEqual(await self._attendees(), {1})
+        self.assertFalse(await self.db.is_event_attendance_synced(job, 555, {2, 3}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import importlib.util
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from services.archive import write_segment
+from services.backtest import OrderFlow, load_order_flow
+from services.db import Database
+from services.market import demand_price
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+class LoadOrderFlowTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-backtest-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        db = Database(path=self.tmp.name)
+        await db.connect()
+        await db.close()
+
+    async def asyncTearDown(self):
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def test_buckets_buys_and_cashouts_with_gaps_filled(self):
+        with sqlite3.connect(self.tmp.name) as raw:
+            raw.executemany(
+                "INSERT INTO transactions(discord_id, type, amount, shares_delta, guild_id, created_at) VALUES(1, ?, 0, ?, 7, ?)",
+                [
+                    ("buy_shares", 10, "2024-01-01 00:05:00"),
+                    ("buy_shares", 5, "2024-01-01 00:50:00"),
+                    ("payout", 99, "2024-01-01 00:10:00"),
+                ],
+            )
+            raw.execute(
+                "INSERT INTO cashout_requests(guild_id, channel_id, message_id, requester_id, shares, created_at) VALUES(7, 1, 1, 1, 4, '2024-01-01 02:30:00')"
+            )
+        flow = load_order_flow(self.tmp.name, 7)
+        self.assertEqual(flow.buys, [15, 0, 0])
+        self.assertEqual(flow.sells, [0, 0, 4])
+        self.assertEqual(flow.starts[1] - flow.starts[0], 3600)
+
+    async def test_archived_buys_are_included_once(self):
+        with sqlite3.connect(self.tmp.name) as raw:
+            raw.execute(
+                "INSERT INTO transactions(tx_id, discord_id, type, amount, shares_delta, guild_id, created_at) VALUES(2, 1, 'buy_shares', 0, 6, 7, '2024-01-01 01:15:00')"
+            )
+        archived = [
+            {"tx_id": 1, "discord_id": 1, "type": "buy_shares", "amount": 0, "shares_delta": 3, "rep_delta": 0, "reference": None, "guild_id": 7, "created_at": "2024-01-01 00:20:00"},
+            # Still in the hot table too, as after a crash before the hot rows were deleted.
+            {"tx_id": 2, "discord_id": 1, "type": "buy_shares", "amount": 0, "shares_delta": 6, "rep_delta": 0, "reference": None, "guild_id": 7, "created_at": "2024-01-01 01:15:00"},
+        ]
+        with tempfile.TemporaryDirectory(prefix="orgbot-backtest-archive-") as root:
+            write_segment(root, "transactions", 7, "2024-01", "tx_id", archived)
+            flow = load_order_flow(self.tmp.name, 7, archive_dir=root)
+            hot_only = load_order_flow(self.tmp.name, 7, archive_dir=None)
+        self.assertEqual(flow.buys, [3, 6])
+        self.assertEqual(hot_only.buys, [6])
+
+
+@unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+class SimulateTests(unittest.TestCase):
+    def test_vectorized_paths_match_scalar_replay(self):
+        from services.backtest import config_grid, simulate
+
+        flow = OrderFlow([i * 3600 for i in range(60)], [300, 0, 50] * 20, [0, 120, 0] * 20, 3600)
+        configs = config_grid(demand_sensitivity_bps=[25, 50, 100], daily_move_cap_bps=[200, 500])
+        result = simulate(flow, configs, start_price=100_000)
+        self.assertEqual(result.prices.shape, (6, 60))
+
+        i = 4  # sensitivity 100, cap 200
+        price = day_open = 100_000
+        net = []
+        for t in range(60):
+            net.append(flow.buys[t] - flow.sells[t])
+            if t and t % 24 == 0:
+                day_open = price
+            price, _ = demand_price(
+                price, day_open, sum(net[-24:]),
+                sensitivity_bps=int(configs["demand_sensitivity_bps"][i]),
+                cap_bps=int(configs["daily_move_cap_bps"][i]),
+                min_price=50_000, max_price=250_000,
+            )
+            self.assertEqual(int(result.prices[i, t]), price)
+        self.assertEqual(len(result.summary()), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
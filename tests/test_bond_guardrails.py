@@ -1,6 +1,8 @@
 import os
+import sqlite3
 import tempfile
 import unittest
+from unittest import mock
 
 from services.db import Database
 
@@ -71,6 +73,81 @@ class BondGuardrailsTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(r2.get("paid_total"), 0)
         self.assertEqual(r2.get("treasury_after"), 50)
 
+    async def test_guild_fifo_redeems_across_members_until_funds_run_out(self):
+        b1 = await self.db.create_payout_bond(user_id=1, amount_owed=100, job_reference="job:1", guild_id=7)
+        b2 = await self.db.create_payout_bond(user_id=2, amount_owed=150, job_reference="job:2", guild_id=7)
+        b3 = await self.db.create_payout_bond(user_id=1, amount_owed=400, job_reference="job:3", guild_id=7)
+        b4 = await self.db.create_payout_bond(user_id=3, amount_owed=10, job_reference="job:4", guild_id=7)
+        await self.db.create_payout_bond(user_id=1, amount_owed=50, job_reference="job:5", guild_id=8)
+        await self.db.set_treasury(300, guild_id=7)
+
+        result = await self.db.redeem_pending_bonds_fifo(guild_id=7, redeemed_by=9)
+
+        # Strict FIFO: bond 3 doesn't fit, so the cheaper bond behind it waits too.
+        self.assertEqual(result["redeemed_count"], 2)
+        self.assertEqual(result["paid_total"], 250)
+        self.assertEqual(result["treasury_after"], 50)
+        self.assertEqual(result["pending_after"], 2)
+        self.assertEqual(await self.db.get_treasury(guild_id=7), 50)
+        self.assertEqual(await self.db.get_balance(1, guild_id=7), 100)
+        self.assertEqual(await self.db.get_balance(2, guild_id=7), 150)
+        with sqlite3.connect(self.tmp.name) as raw:
+            statuses = dict(raw.execute("SELECT bond_id, status FROM payout_bonds WHERE guild_id=7").fetchall())
+            refs = [r[0] for r in raw.execute("SELECT reference FROM transactions WHERE type='bond_redeem' ORDER BY tx_id")]
+        self.assertEqual(statuses, {b1: "redeemed", b2: "redeemed", b3: "pending", b4: "pending"})
+        self.assertEqual(refs, [f"bond:{b1}|redeemed_by:9", f"bond:{b2}|redeemed_by:9"])
+        self.assertEqual(len(await self.db.list_pending_bonds(user_id=1, guild_id=8)), 1)
+
+    async def test_treasury_increase_triggers_auto_redeem(self):
+        await self.db.create_payout_bond(user_id=5, amount_owed=100, job_reference="job:1", guild_id=7)
+        with mock.patch("services.db.BOND_AUTO_REDEEM", True):
+            await self.db.set_treasury(250, updated_by=1, guild_id=7)
+        self.assertEqual(await self.db.get_treasury(guild_id=7), 150)
+        self.assertEqual(await self.db.get_balance(5, guild_id=7), 100)
+
+        await self.db.create_payout_bond(user_id=5, amount_owed=40, job_reference="job:2")
+        with mock.patch("services.db.BOND_AUTO_REDEEM", True):
+            self.assertEqual(await self.db.adjust_treasury(100, updated_by=1), 60)
+
+    async def test_liability_counters_follow_bond_lifecycle(self):
+        await self.db.create_payout_bond(user_id=1, amount_owed=100, guild_id=7)
+        await self.db.create_payout_bond(user_id=1, amount_owed=50, guild_id=7)
+        await self.db.create_payout_bond(user_id=2, amount_owed=30, guild_id=7)
+        self.assertEqual(await self.db.get_bond_liability(guild_id=7), (3, 180))
+        self.assertEqual(await self.db.get_user_outstanding_bonds(1, guild_id=7), (2, 150))
+
+        await self.db.set_treasury(120, guild_id=7)
+        await self.db.redeem_bonds_for_user(user_id=1, guild_id=7)
+        self.assertEqual(await self.db.get_total_outstanding_bonds(guild_id=7), 80)
+        self.assertEqual(await self.db.get_user_outstanding_bonds(1, guild_id=7), (1, 50))
+        self.assertEqual((await self.db.get_account_snapshot(1, guild_id=7)).pending_bonds_total, 50)
+
+        report = await self.db.verify_bond_liability(all_guilds=True)
+        self.assertEqual((report["guild_mismatches"], report["user_mismatches"]), ([], []))
+
+    async def test_verify_rebuilds_drifted_counters(self):
+        await self.db.create_payout_bond(user_id=1, amount_owed=100, guild_id=7)
+        await self.db.conn.execute("UPDATE bond_liability_by_user SET pending_total=999 WHERE guild_id=7 AND user_id=1")
+        await self.db.conn.execute("DELETE FROM bond_liability_by_guild WHERE guild_id=7")
+        await self.db.conn.commit()
+
+        report = await self.db.verify_bond_liability(guild_id=7, repair=True)
+        self.assertEqual(report["guild_mismatches"], [(7, (0, 0), (1, 100))])
+        self.assertEqual(report["user_mismatches"], [((7, 1), (1, 999), (1, 100))])
+        self.assertTrue(report["repaired"])
+        self.assertEqual(await self.db.get_bond_liability(guild_id=7), (1, 100))
+        self.assertEqual((await self.db.verify_bond_liability(guild_id=7))["user_mismatches"], [])
+
+    async def test_verify_scope_none_is_guild_zero(self):
+        await self.db.create_payout_bond(user_id=1, amount_owed=100, guild_id=7)
+        await self.db.create_payout_bond(user_id=2, amount_owed=40)
+        await self.db.conn.execute("UPDATE bond_liability_by_guild SET pending_total=1 WHERE guild_id IN (0, 7)")
+        await self.db.conn.commit()
+
+        self.assertEqual((await self.db.verify_bond_liability())["guild_mismatches"], [(0, (1, 1), (1, 40))])
+        report = await self.db.verify_bond_liability(all_guilds=True)
+        self.assertEqual(sorted(g for g, _, _ in report["guild_mismatches"]), [0, 7])
+
     async def test_negative_bond_rejected(self):
         with self.assertRaises(ValueError):
             await self.db.create_payout_bond(user_id=123, amount_owed=-10)
@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+
+from services.card_updates import CardUpdater
+
+
+class _FakeMessage:
+    def __init__(self, bot, channel_id: int, message_id: int):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.message_id = message_id
+
+    async def edit(self, **kwargs):
+        self.bot.edits.append((self.channel_id, self.message_id, kwargs))
+
+
+class _FakeChannel:
+    def __init__(self, bot, channel_id: int):
+        self.bot = bot
+        self.channel_id = channel_id
+
+    def get_partial_message(self, message_id: int):
+        return _FakeMessage(self.bot, self.channel_id, message_id)
+
+
+class _FakeBot:
+    def __init__(self):
+        self.edits: list[tuple[int, int, dict]] = []
+
+    def get_partial_messageable(self, channel_id: int):
+        return _FakeChannel(self, channel_id)
+
+
+class CardUpdaterTests(unittest.IsolatedAsyncioTestCase):
+    async def test_burst_sends_only_latest_state_per_message(self):
+        bot = _FakeBot()
+        updater = CardUpdater(bot, delay_ms=20)
+        state = {"status": "claimed"}
+        renders = []
+
+        async def render():
+            renders.append(state["status"])
+            return {"content": state["status"]}
+
+        updater.schedule(1, 100, render)
+        state["status"] = "completed"
+        updater.schedule(1, 100, render)
+        state["status"] = "paid"
+        updater.schedule(1, 100, render)
+        updater.schedule(2, 200, render)
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(renders, ["paid", "paid"])
+        self.assertEqual(
+            sorted(bot.edits, key=lambda e: e[1]),
+            [(1, 100, {"content": "paid"}), (2, 200, {"content": "paid"})],
+        )
+
+    async def test_render_none_skips_edit_and_close_flushes(self):
+        bot = _FakeBot()
+        updater = CardUpdater(bot, delay_ms=60_000)
+
+        async def skip():
+            return None
+
+        async def render():
+            return {"content": "x"}
+
+        updater.schedule(1, 100, skip)
+        updater.schedule(1, 101, render)
+        await updater.close()
+
+        self.assertEqual(bot.edits, [(1, 101, {"content": "x"})])
+        self.assertEqual(updater._tasks, {})
+
+    async def test_push_sends_now_and_runs_after_hook(self):
+        bot = _FakeBot()
+        updater = CardUpdater(bot, delay_ms=60_000)
+        sent = []
+
+        async def stale():
+            return {"content": "stale"}
+
+        async def render():
+            return {"content": "now"}
+
+        async def after():
+            sent.append(len(bot.edits))
+
+        updater.schedule(1, 100, stale)
+        self.assertTrue(await updater.push(1, 100, render, after))
+        self.assertEqual(bot.edits, [(1, 100, {"content": "now"})])
+        self.assertEqual(sent, [1])
+        # The queued edit was replaced, so the pending timer has nothing left to send.
+        self.assertFalse(await updater.send(100))
+        await updater.close()
+
+    async def test_failed_edit_is_logged_not_raised(self):
+        bot = _FakeBot()
+        updater = CardUpdater(bot, delay_ms=0)
+
+        async def boom():
+            raise RuntimeError("render failed")
+
+        updater.schedule(1, 100, boom)
+        self.assertFalse(await updater.send(100))
+        self.assertEqual(bot.edits, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+from services.charts import ChartCache, encode_png, render_price_chart
+from services.db import Database
+
+
+class RenderChartTests(unittest.TestCase):
+    def test_png_has_expected_header_and_pixels(self):
+        data = render_price_chart([100, 120, 90, 130], [(100, 130, 90, 120), (120, 125, 80, 85)], width=64, height=32)
+        self.assertTrue(data.startswith(b"\x89PNG\r\n\x1a\n"))
+        self.assertEqual(struct.unpack(">II", data[16:24]), (64, 32))
+        idat_len = struct.unpack(">I", data[33:37])[0]
+        self.assertEqual(data[37:41], b"IDAT")
+        raw = zlib.decompress(data[41:41 + idat_len])
+        self.assertEqual(len(raw), 32 * (1 + 64 * 3))
+
+    def test_empty_series_still_renders(self):
+        data = render_price_chart([], [], width=8, height=8)
+        self.assertTrue(data.endswith(b"IEND\xaeB`\x82"))
+
+    def test_encode_png_round_trips_rows(self):
+        rgb = bytearray(b"\x01\x02\x03" * 4)
+        data = encode_png(2, 2, rgb)
+        idat_len = struct.unpack(">I", data[33:37])[0]
+        self.assertEqual(zlib.decompress(data[41:41 + idat_len]), b"\x00" + bytes(rgb[:6]) + b"\x00" + bytes(rgb[6:]))
+
+
+class ChartCacheTests(unittest.IsolatedAsyncioTestCase):
+    async def test_lru_evicts_oldest(self):
+        cache = ChartCache(max_entries=2)
+        cache.put(("a",), b"1")
+        cache.put(("b",), b"2")
+        cache.get(("a",))
+        cache.put(("c",), b"3")
+        self.assertIsNone(cache.get(("b",)))
+        self.assertEqual(cache.get(("a",)), b"1")
+
+    async def test_concurrent_requests_share_one_render(self):
+        cache = ChartCache()
+        calls = 0
+
+        async def render():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return b"png"
+
+        results = await asyncio.gather(*(cache.get_or_render((1, "7d", 0), render) for _ in range(5)))
+        self.assertEqual(results, [b"png"] * 5)
+        self.assertEqual(calls, 1)
+        await cache.get_or_render((1, "7d", 0), render)
+        self.assertEqual(calls, 1)
+
+    async def test_failed_render_is_not_cached(self):
+        cache = ChartCache()
+
+        async def boom():
+            raise RuntimeError("render failed")
+
+        with self.assertRaises(RuntimeError):
+            await cache.get_or_render(("k",), boom)
+        self.assertIsNone(cache.get(("k",)))
+
+
+class PriceVersionTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-charts-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def test_version_moves_only_with_price(self):
+        with mock.patch("services.market.MARKET_FLUSH_MS", 60_000):
+            v0 = await self.db.market.price_version(1)
+            await self.db.set_stock_price_state(guild_id=1, current_price=101_000)
+            v1 = await self.db.market.price_version(1)
+            await self.db.set_stock_price_state(guild_id=1, current_price=101_000)
+            self.assertEqual(await self.db.market.price_version(1), v1)
+            self.assertGreater(v1, v0)
+            await self.db.market.flush()
+        candles = await self.db.list_stock_candles(1, 86400, 0)
+        self.assertEqual(candles[-1][4], 101_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
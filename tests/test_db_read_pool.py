@@ -0,0 +1,80 @@
+import asyncio
+import contextvars
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from services.db import Database
+
+
+class ReadPoolTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-readpool-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    def _unrelated(self, coro):
+        return asyncio.create_task(coro, context=contextvars.Context())
+
+    async def test_readers_see_committed_writes(self):
+        self.assertTrue(self.db._readers)
+        await self.db.add_balance(7, 1234, "seed", guild_id=1)
+        self.assertEqual(await self.db.get_balance(7, guild_id=1), 1234)
+        await self.db.set_guild_setting(1, "JOBS_CHANNEL_ID", "55")
+        self.assertEqual(await self.db.get_guild_setting(1, "JOBS_CHANNEL_ID"), "55")
+
+    async def test_reader_connections_are_read_only(self):
+        rconn = self.db._readers[0]
+        with self.assertRaises(sqlite3.OperationalError):
+            await rconn.execute("INSERT INTO guild_settings(guild_id, key, value) VALUES(1, 'x', 'y')")
+
+    async def test_reads_inside_write_transaction_use_writer(self):
+        await self.db._begin()
+        try:
+            await self.db.conn.execute(
+                "INSERT INTO members_by_guild(guild_id, discord_id, balance) VALUES(2, 8, 99)"
+            )
+            self.assertEqual(await self.db.get_balance(8, guild_id=2), 99)
+        finally:
+            await self.db._rollback()
+        self.assertEqual(await self.db.get_balance(8, guild_id=2), 0)
+
+
+    async def test_other_tasks_read_from_pool_during_a_write_transaction(self):
+        await self.db._begin()
+        try:
+            await self.db.conn.execute(
+                "INSERT INTO members_by_guild(guild_id, discord_id, balance) VALUES(2, 9, 50)"
+            )
+            # Another task neither sees the uncommitted row nor queues behind the writer.
+            self.assertEqual(await self._unrelated(self.db.get_balance(9, guild_id=2)), 0)
+            self.assertEqual(await self.db.get_balance(9, guild_id=2), 50)
+        finally:
+            await self.db._rollback()
+
+    async def test_pending_grouped_writes_do_not_pin_reads_to_writer(self):
+        with mock.patch("services.db.DB_GROUP_COMMIT_MS", 60_000):
+            self.assertTrue(await self.db.add_event_attendee(1, 100))
+            self.assertTrue(self.db.conn.in_transaction)
+            # The flow that queued the write reads it back; unrelated tasks use the pool until the group commit.
+            self.assertEqual(len(await self.db.list_event_attendees(1)), 1)
+            self.assertEqual(len(await self._unrelated(self.db.list_event_attendees(1))), 0)
+            await self.db.flush()
+            self.assertEqual(len(await self._unrelated(self.db.list_event_attendees(1))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+from services.db import Database
+
+
+class EscrowReconcileTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-reconcile-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def _seed_guild(self, gid: int):
+        db = self.db
+        for uid in (2, 3, 4):
+            await db.add_balance(uid, 1_000_000, "seed", guild_id=gid)
+            await db.buy_shares(uid, shares_delta=5, cost=500_000, guild_id=gid)
+        # 2: correctly locked, 3: lock drifted high, 4: request without a lock.
+        await db.lock_shares(2, 2, guild_id=gid)
+        await db.create_cashout_request(gid, 1, 1, 2, 2)
+        await db.lock_shares(3, 4, guild_id=gid)
+        await db.create_cashout_request(gid, 1, 2, 3, 1)
+        await db.create_cashout_request(gid, 1, 3, 4, 3)
+        await db.flush()
+
+    async def _locked(self, uid: int, gid: int) -> int:
+        row = await self.db._fetchone(
+            "SELECT locked_shares FROM members_by_guild WHERE guild_id=? AND discord_id=?", (gid, uid)
+        )
+        return int(row[0])
+
+    async def test_guild_dry_run_then_apply(self):
+        gid = 1
+        await self._seed_guild(gid)
+
+        data = await self.db.reconcile_escrow(dry_run=True, guild_id=gid)
+        by_uid = {r["discord_id"]: r for r in data["users"]}
+        self.assertEqual(sorted(by_uid), [2, 3, 4])
+        self.assertFalse(by_uid[2]["changed"])
+        self.assertEqual((by_uid[3]["locked_before"], by_uid[3]["locked_after"]), (4, 1))
+        self.assertEqual((by_uid[4]["locked_before"], by_uid[4]["locked_after"]), (0, 3))
+        self.assertEqual(await self._locked(3, gid), 4)
+
+        async with self.db.reconcile_escrow_session(dry_run=False, guild_id=gid) as run:
+            self.assertEqual((run.scanned, run.changed), (3, 2))
+            changed = [r["discord_id"] async for page in run.pages(changed_only=True) for r in page]
+        self.assertEqual(changed, [3, 4])
+        self.assertEqual([await self._locked(uid, gid) for uid in (2, 3, 4)], [2, 1, 3])
+
+        data = await self.db.reconcile_escrow(dry_run=True, guild_id=gid)
+        self.assertFalse(any(r["changed"] for r in data["users"]))
+
+    async def test_force_clear_rejects_requests_and_unlocks(self):
+        gid = 1
+        await self._seed_guild(gid)
+
+        data = await self.db.reconcile_escrow(dry_run=False, force_clear_active=True, handled_by=9, discord_id=2, guild_id=gid)
+        self.assertEqual(len(data["requests_rejected"]), 1)
+        self.assertEqual([r["discord_id"] for r in data["users"]], [2])
+        self.assertEqual(await self._locked(2, gid), 0)
+        self.assertEqual(await self._locked(3, gid), 4)
+
+        req = await self.db.get_cashout_request(data["requests_rejected"][0], guild_id=gid)
+        self.assertEqual((req[6], req[10]), ("rejected", 9))
+        self.assertEqual(await self.db.count_cashout_requests(["pending"], guild_id=gid), 2)
+
+    async def test_pages_are_keyset_ordered(self):
+        gid = 1
+        await self._seed_guild(gid)
+        async with self.db.reconcile_escrow_session(guild_id=gid) as run:
+            pages = [[r["discord_id"] for r in page] async for page in run.pages(page_size=2)]
+        self.assertEqual(pages, [[2, 3], [4]])
+
+    async def test_legacy_scope_updates_global_escrow(self):
+        db = self.db
+        await db.add_balance(5, 1_000_000, "seed")
+        await db.buy_shares(5, shares_delta=3, cost=300_000)
+        await db.lock_shares(5, 3)
+        await db.flush()
+
+        data = await db.reconcile_escrow(dry_run=False)
+        by_uid = {r["discord_id"]: r for r in data["users"]}
+        self.assertEqual((by_uid[5]["locked_before"], by_uid[5]["locked_after"]), (3, 0))
+        self.assertEqual(await db.get_shares_available(5), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from services.db import Database
+
+
+class GroupCommitTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-groupcommit-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        # A long window keeps grouped writes pending until the test flushes them.
+        self.window = mock.patch("services.db.DB_GROUP_COMMIT_MS", 60_000)
+        self.window.start()
+
+    async def asyncTearDown(self):
+        self.window.stop()
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    def _committed_attendees(self, job_id: int) -> int:
+        with sqlite3.connect(self.tmp.name) as other:
+            return int(other.execute("SELECT COUNT(*) FROM job_event_attendance WHERE job_id=?", (job_id,)).fetchone()[0])
+
+    async def test_grouped_writes_are_visible_locally_and_durable_after_flush(self):
+        self.assertTrue(await self.db.add_event_attendee(1, 100))
+        self.assertTrue(await self.db.add_event_attendee(1, 101))
+
+        self.assertEqual(len(await self.db.list_event_attendees(1)), 2)
+        self.assertEqual(self._committed_attendees(1), 0)
+
+        await self.db.flush()
+        self.assertEqual(self._committed_attendees(1), 2)
+
+    async def test_explicit_transaction_commits_pending_group_first(self):
+        await self.db.add_event_attendee(2, 200)
+        await self.db.set_treasury(500, guild_id=1)
+        self.assertEqual(self._committed_attendees(2), 1)
+        self.assertEqual(await self.db.get_treasury(guild_id=1), 500)
+
+    async def test_grouped_write_waits_for_open_transaction(self):
+        await self.db._begin()
+        write = asyncio.create_task(self.db.add_event_attendee(4, 400))
+        await asyncio.sleep(0.05)
+        self.assertFalse(write.done())
+        # Rolling back the explicit transaction must not take the grouped write with it.
+        await self.db._rollback()
+        self.assertTrue(await write)
+        await self.db.flush()
+        self.assertEqual(self._committed_attendees(4), 1)
+
+    async def test_concurrent_writers_take_turns(self):
+        await asyncio.gather(
+            *(self.db.set_guild_setting(1, f"KEY_{i}", str(i)) for i in range(5)),
+            *(self.db.set_treasury(100 + i, guild_id=1) for i in range(5)),
+            *(self.db.add_event_attendee(5, 500 + i) for i in range(5)),
+        )
+        await self.db.flush()
+        self.assertEqual(self._committed_attendees(5), 5)
+        self.assertEqual(await self.db.get_guild_setting(1, "KEY_4"), "4")
+        self.assertFalse(self.db._write_lock.locked())
+
+    async def test_close_flushes_pending_writes(self):
+        await self.db.add_event_attendee(3, 300)
+        await self.db.close()
+        self.assertEqual(self._committed_attendees(3), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from services.db import Database
+
+
+class GuildSettingsCacheTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-settings-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def _trace(self) -> list[str]:
+        statements: list[str] = []
+        for conn in [self.db.conn, *self.db._readers]:
+            await conn.set_trace_callback(statements.append)
+        return statements
+
+    async def test_warmed_settings_are_served_parsed_without_queries(self):
+        await self.db.set_guild_settings(1, {"JOB_CATEGORY_CHANNEL_MAP": "Mining:10, event:11,bad", "JOBS_CHANNEL_ID": "12"})
+        await self.db.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+        statements = await self._trace()
+        self.assertEqual(await self.db.get_guild_setting_parsed(1, "JOB_CATEGORY_CHANNEL_MAP"), {"mining": 10, "event": 11})
+        self.assertEqual(await self.db.get_guild_setting_parsed(1, "JOBS_CHANNEL_ID"), 12)
+        self.assertEqual(await self.db.get_guild_setting_parsed(2, "JOBS_CHANNEL_ID", 99), 99)
+        self.assertEqual(await self.db.get_guild_settings(2), {})
+        self.assertEqual(statements, [])
+
+    async def test_setters_write_through_to_parsed_values(self):
+        self.assertIsNone(await self.db.get_guild_setting_parsed(3, "JOBS_CHANNEL_ID"))
+        await self.db.set_guild_setting(3, "JOBS_CHANNEL_ID", "44")
+        self.assertEqual(await self.db.get_guild_setting_parsed(3, "JOBS_CHANNEL_ID"), 44)
+        await self.db.set_guild_settings(3, {"JOBS_CHANNEL_ID": "not-a-channel"})
+        self.assertIsNone(await self.db.get_guild_setting_parsed(3, "JOBS_CHANNEL_ID"))
+        self.assertEqual(await self.db.get_guild_setting(3, "JOBS_CHANNEL_ID"), "not-a-channel")
+
+    async def test_invalidated_guild_reloads_from_table(self):
+        await self.db.set_guild_setting(4, "JOBS_CHANNEL_ID", "1")
+        await self.db.conn.execute("UPDATE guild_settings SET value='2' WHERE guild_id=4")
+        await self.db.conn.commit()
+        self.assertEqual(await self.db.get_guild_setting_parsed(4, "JOBS_CHANNEL_ID"), 1)
+        self.db.guild_settings.invalidate(4)
+        self.assertEqual(await self.db.get_guild_setting_parsed(4, "JOBS_CHANNEL_ID"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from services.db import Database
+
+
+class JobCardRefreshTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-card-refresh-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def test_event_cards_listed_in_one_query_newest_first(self):
+        db = self.db
+        op = await db.create_job(10, 100, "Op", "desc", 100, created_by=1, category="event", guild_id=1)
+        await db.create_job(10, 101, "Haul", "desc", 100, created_by=1, guild_id=1)
+        gone = await db.create_job(10, 102, "Old op", "desc", 100, created_by=1, category="event", guild_id=1)
+        await db.cancel_job(gone)
+        other = await db.create_job(20, 200, "Op 2", "desc", 100, created_by=1, category="event", guild_id=2)
+
+        cards = await db.list_event_job_cards(["open", "claimed", "completed", "paid"])
+        self.assertEqual(cards, [(other, 2, 20, 200), (op, 1, 10, 100)])
+        self.assertEqual(await db.list_event_job_cards(["open"], limit=1), [(other, 2, 20, 200)])
+        self.assertEqual(await db.list_event_job_cards([]), [])
+
+    async def test_min_level_and_fingerprints_are_stored(self):
+        db = self.db
+        known = await db.create_job(10, 100, "Op", "desc", 100, created_by=1, category="event", min_level=5)
+        legacy = await db.create_job(10, 101, "Op", "desc", 100, created_by=1, category="event")
+        self.assertEqual(await db.get_job_min_level(known), 5)
+        self.assertIsNone(await db.get_job_min_level(legacy))
+        await db.set_job_min_level(legacy, 0)
+        self.assertEqual(await db.get_job_min_level(legacy), 0)
+
+        self.assertIsNone(await db.get_job_card_fingerprint(100))
+        await db.set_job_card_fingerprint(100, known, "abc")
+        await db.set_job_card_fingerprint(100, known, "def")
+        self.assertEqual(await db.get_job_card_fingerprint(100), "def")
+
+
+if __name__ == "__main__":
+    unittest.main()
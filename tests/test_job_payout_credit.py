@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from services.db import Database
+
+
+class SettleAndCreditTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-payout-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def _completed_job(self, reward: int, category: str = "general") -> int:
+        job_id = await self.db.create_job(1, 1, "Op", "desc", reward, created_by=1, category=category, guild_id=5)
+        self.assertTrue(await self.db.claim_job(job_id, claimed_by=10))
+        self.assertTrue(await self.db.complete_job(job_id))
+        return job_id
+
+    async def test_credits_every_target_in_one_commit(self):
+        await self.db.set_treasury(1_000, guild_id=5)
+        await self.db.add_rep(11, 95, guild_id=5)
+        job_id = await self._completed_job(900, category="event")
+
+        result = await self.db.settle_and_credit_job_payout(
+            job_id,
+            [(10, 300), (11, 300), (12, 300)],
+            confirmed_by=1,
+            guild_id=5,
+            rep_per_target=10,
+            per_level=100,
+            event_snapshot=True,
+        )
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["rep_added"], 30)
+        self.assertEqual(result["levels"], {10: (0, 0), 11: (0, 1), 12: (0, 0)})
+        for uid in (10, 11, 12):
+            self.assertEqual(await self.db.get_balance(uid, guild_id=5), 300)
+        self.assertEqual(await self.db.get_rep(11, guild_id=5), 105)
+
+        with sqlite3.connect(self.tmp.name) as raw:
+            types = raw.execute(
+                "SELECT type, COUNT(*) FROM transactions WHERE guild_id=5 AND reference LIKE ? GROUP BY type ORDER BY type",
+                (f"job:{job_id}|%",),
+            ).fetchall()
+            ledger = dict(raw.execute("SELECT entry_type, COUNT(*) FROM ledger_entries WHERE guild_id=5 GROUP BY entry_type").fetchall())
+        self.assertEqual(types, [("payout", 3), ("rep", 3)])
+        self.assertEqual(ledger["job_payout"], 3)
+        self.assertEqual(ledger["event_payout_snapshot"], 1)
+
+    async def test_rejected_settlement_credits_nothing(self):
+        job_id = await self.db.create_job(1, 1, "Open", "desc", 100, created_by=1, guild_id=5)
+        result = await self.db.settle_and_credit_job_payout(job_id, [(10, 100)], confirmed_by=1, guild_id=5, rep_per_target=10)
+        self.assertFalse(result["ok"])
+        self.assertEqual(await self.db.get_balance(10, guild_id=5), 0)
+        self.assertEqual(await self.db.get_rep(10, guild_id=5), 0)
+
+    async def test_ledger_balance_tracks_batched_entries(self):
+        await self.db.set_treasury(500, guild_id=5)
+        job_id = await self._completed_job(400)
+        await self.db.settle_and_credit_job_payout(job_id, [(10, 200), (11, 200)], confirmed_by=1, guild_id=5)
+        current, ledger_treasury, drift, _ = await self.db.get_ledger_reconcile(guild_id=5)
+        with sqlite3.connect(self.tmp.name) as raw:
+            expected = raw.execute(
+                """
+                SELECT COALESCE(SUM(CASE WHEN to_account='treasury' THEN amount WHEN from_account='treasury' THEN -amount ELSE 0 END), 0)
+                FROM ledger_entries WHERE guild_id=5 AND entry_type != 'treasury_set'
+                """
+            ).fetchone()[0]
+        self.assertEqual(ledger_treasury, 500 + expected)
+        self.assertEqual((current, drift), (100, 0))
+
+    async def _assert_single_target_payout_reconciles(self):
+        await self.db.set_treasury(1_000, guild_id=5)
+        job_id = await self._completed_job(100)
+        result = await self.db.settle_and_credit_job_payout(job_id, [(10, 100)], confirmed_by=1, guild_id=5)
+        self.assertTrue(result["ok"])
+        current, ledger_treasury, drift, _ = await self.db.get_ledger_reconcile(guild_id=5)
+        with sqlite3.connect(self.tmp.name) as raw:
+            expected = raw.execute(
+                """
+                SELECT COALESCE(SUM(CASE WHEN to_account='treasury' THEN amount WHEN from_account='treasury' THEN -amount ELSE 0 END), 0)
+                FROM ledger_entries WHERE guild_id=5 AND entry_type != 'treasury_set'
+                """
+            ).fetchone()[0]
+            running = raw.execute("SELECT treasury_balance FROM ledger_balances WHERE guild_id=5").fetchone()[0]
+        self.assertEqual(current, 900)
+        self.assertEqual(drift, 0)
+        self.assertEqual(ledger_treasury, 1_000 + expected)
+        self.assertEqual(running, ledger_treasury)
+
+    async def test_single_target_payout_reconciles(self):
+        await self._assert_single_target_payout_reconciles()
+
+    async def test_single_target_payout_reconciles_with_checkpoint_every_entry(self):
+        with mock.patch("services.db.LEDGER_CHECKPOINT_INTERVAL", 1):
+            await self._assert_single_target_payout_reconciles()
+
+
+if __name__ == "__main__":
+    unittest.main()
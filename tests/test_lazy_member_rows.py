@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+from services.db import Database
+
+
+class LazyMemberRowsTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-lazy-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def test_reads_do_not_write(self):
+        changes_before = self.db.conn.total_changes
+        self.assertEqual(await self.db.get_balance(5, guild_id=1), 0)
+        self.assertEqual(await self.db.get_shares_available(5, guild_id=1), 0)
+        self.assertEqual(await self.db.get_level(5, guild_id=1), 0)
+        self.assertEqual(await self.db.get_treasury(guild_id=1), 0)
+        self.assertEqual(await self.db.get_treasury_meta(guild_id=1), (0, None, None))
+        self.assertEqual(self.db.conn.total_changes, changes_before)
+        self.assertFalse(self.db.conn.in_transaction)
+
+    async def test_first_write_materializes_member(self):
+        await self.db.add_rep(6, 250, guild_id=1)
+        self.assertEqual(await self.db.get_rep(6, guild_id=1), 250)
+        self.assertEqual(await self.db.get_level(6, guild_id=1), 2)
+        self.assertEqual(await self.db.get_balance(6, guild_id=1), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from services.db import Database
+
+
+class LedgerCheckpointTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-ledger-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    def _checkpoint_count(self, gid: int) -> int:
+        with sqlite3.connect(self.tmp.name) as raw:
+            return int(raw.execute("SELECT COUNT(*) FROM ledger_checkpoints WHERE guild_id=?", (gid,)).fetchone()[0])
+
+    async def test_reconcile_tracks_running_balance_across_checkpoints(self):
+        gid = 1
+        with mock.patch("services.db.LEDGER_CHECKPOINT_INTERVAL", 3):
+            await self.db.set_treasury(1_000, updated_by=9, guild_id=gid)
+            await self.db.add_balance(2, 5_000, "seed", guild_id=gid)
+            for _ in range(4):
+                await self.db.buy_shares(2, shares_delta=1, cost=100, guild_id=gid)
+            await self.db.add_balance(2, 250, "payout", reference="job:1", guild_id=gid)
+
+        current, ledger, drift, baseline_at = await self.db.get_ledger_reconcile(guild_id=gid)
+        self.assertEqual(ledger, 1_000 + 400 - 250)
+        self.assertEqual(current, 1_000)
+        self.assertEqual(drift, current - ledger)
+        self.assertIsNotNone(baseline_at)
+        # Baseline checkpoint plus one every three entries afterwards.
+        self.assertEqual(self._checkpoint_count(gid), 2)
+
+    async def test_new_baseline_resets_ledger_balance(self):
+        gid = 2
+        await self.db.set_treasury(500, guild_id=gid)
+        await self.db.add_balance(3, 1_000, "seed", guild_id=gid)
+        await self.db.buy_shares(3, shares_delta=1, cost=200, guild_id=gid)
+        await self.db.set_treasury(50, guild_id=gid)
+
+        _, ledger, drift, _ = await self.db.get_ledger_reconcile(guild_id=gid)
+        self.assertEqual(ledger, 50)
+        self.assertEqual(drift, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import importlib.util
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from services.db import Database
+from services.market import demand_price, nudged_price, price_bounds
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+class PricingTests(unittest.TestCase):
+    def test_demand_moves_in_steps_and_respects_daily_band(self):
+        kwargs = dict(sensitivity_bps=50, cap_bps=500, min_price=50_000, max_price=250_000)
+        self.assertEqual(demand_price(100_000, 100_000, 99, **kwargs), (100_000, 0))
+        self.assertEqual(demand_price(100_000, 100_000, 250, **kwargs), (101_000, 100))
+        self.assertEqual(demand_price(100_000, 100_000, -150, **kwargs), (99_000, -100))
+        # 50 steps would be +25%; the daily cap holds it to +5% of the open.
+        self.assertEqual(demand_price(104_000, 100_000, 5_000, **kwargs), (105_000, 500))
+
+    def test_bounds_and_nudge(self):
+        self.assertEqual(price_bounds(100_000, 500, 50_000, 250_000), (95_000, 105_000))
+        # Floor above the ceiling still gives an ordered band.
+        self.assertEqual(price_bounds(100_000, 500, 200_000, 250_000), (105_000, 200_000))
+        self.assertEqual(nudged_price(100_000, 100_000, 10_000, cap_bps=500, min_price=1, max_price=10**12), 105_000)
+
+    @unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+    def test_array_inputs_match_scalar_path(self):
+        import numpy as np
+
+        net = np.array([-5_000, -150, 0, 99, 250, 5_000])
+        prices, bps = demand_price(np.full(6, 100_000), np.full(6, 100_000), net, sensitivity_bps=50, cap_bps=500, min_price=50_000, max_price=250_000)
+        expected = [demand_price(100_000, 100_000, int(n), sensitivity_bps=50, cap_bps=500, min_price=50_000, max_price=250_000) for n in net]
+        self.assertEqual(prices.tolist(), [p for p, _ in expected])
+        self.assertEqual(bps.tolist(), [b for _, b in expected])
+
+
+class MarketEngineTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-market-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def test_reads_do_not_write(self):
+        changes_before = self.db.conn.total_changes
+        self.assertEqual((await self.db.get_stock_price_state(guild_id=5))["current_price"], 100_000)
+        self.assertEqual((await self.db.get_stock_market_config(guild_id=5))["max_price"], 250_000)
+        self.assertEqual((await self.db.get_stock_trade_metrics(guild_id=5))["net_units_24h"], 0)
+        self.assertEqual(self.db.conn.total_changes, changes_before)
+
+    async def test_trades_reprice_in_memory_and_flush_later(self):
+        gid = 1
+        with mock.patch("services.market.MARKET_FLUSH_MS", 60_000):
+            await self.db.get_stock_price_state(guild_id=gid)
+            statements: list[str] = []
+            for conn in [self.db.conn, *self.db._readers]:
+                await conn.set_trace_callback(statements.append)
+
+            await self.db.record_stock_trade_metrics("buy", 250, guild_id=gid)
+            before, after, demand_bps = await self.db.market.reprice(gid)
+            await self.db.record_stock_trade_metrics("sell", 50, guild_id=gid)
+            await self.db.market.reprice(gid)
+            self.assertEqual((before, after, demand_bps), (100_000, 101_000, 100))
+            self.assertEqual(statements, [])
+
+            await self.db.market.flush()
+
+        with sqlite3.connect(self.tmp.name) as raw:
+            state = raw.execute("SELECT current_price, day_high_price FROM stock_price_state WHERE guild_id=?", (gid,)).fetchone()
+            metrics = raw.execute("SELECT buys_units_24h, sells_units_24h, net_units_24h FROM stock_trade_metrics WHERE guild_id=?", (gid,)).fetchone()
+            history = [r[0] for r in raw.execute("SELECT price FROM stock_price_history WHERE guild_id=? ORDER BY id", (gid,))]
+        self.assertEqual(state, (102_010, 102_010))
+        self.assertEqual(metrics, (250, 50, 200))
+        self.assertEqual(history, [101_000, 102_010])
+
+    async def test_failed_begin_keeps_unsaved_state(self):
+        gid = 3
+        with mock.patch("services.market.MARKET_FLUSH_MS", 60_000):
+            await self.db.record_stock_trade_metrics("buy", 250, guild_id=gid)
+            await self.db.market.reprice(gid)
+            # A stray transaction on the writer makes BEGIN IMMEDIATE fail.
+            await self.db.conn.execute("BEGIN")
+            with self.assertRaises(sqlite3.OperationalError):
+                await self.db.market.flush()
+            await self.db.conn.rollback()
+            self.assertFalse(self.db._write_lock.locked())
+            await self.db.market.flush()
+
+        with sqlite3.connect(self.tmp.name) as raw:
+            history = [r[0] for r in raw.execute("SELECT price FROM stock_price_history WHERE guild_id=?", (gid,))]
+        self.assertEqual(history, [101_000])
+
+    async def test_config_writes_through_and_close_flushes(self):
+        await self.db.set_stock_market_config(guild_id=2, min_price=90_000, max_price=110_000)
+        await self.db.set_stock_price_state(guild_id=2, current_price=120_000)
+        with self.assertRaises(ValueError):
+            await self.db.set_stock_market_config(guild_id=2, min_price=200_000)
+        await self.db.close()
+
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.assertEqual((await self.db.get_stock_market_config(guild_id=2))["max_price"], 110_000)
+        self.assertEqual((await self.db.get_stock_price_state(guild_id=2))["current_price"], 120_000)
+        _, after = await self.db.market.nudge(-100, guild_id=2)
+        self.assertEqual(after, 105_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from services.db import JOB_ATTENDANCE_SYNC_SCHEMA, MEMBERS_BY_GUILD_SCHEMA, MIGRATIONS, SCHEMA_VERSION, Database
+
+
+class MigrationTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-migrate-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    def _user_version(self) -> int:
+        with sqlite3.connect(self.tmp.name) as raw:
+            return int(raw.execute("PRAGMA user_version").fetchone()[0])
+
+    async def test_fresh_database_is_stamped_current(self):
+        await self.db.connect()
+        self.assertEqual(self._user_version(), SCHEMA_VERSION)
+
+    async def test_current_schema_skips_legacy_backfill(self):
+        await self.db.connect()
+        await self.db.add_balance(1, 10, "seed")
+        await self.db.close()
+
+        with mock.patch.dict(os.environ, {"GUILD_ID": "77"}):
+            self.db = Database(path=self.tmp.name)
+            await self.db.connect()
+
+        rows = await self.db.list_transactions(limit=5)
+        self.assertEqual(len(rows), 1)
+
+    async def test_unversioned_database_is_upgraded_once(self):
+        with sqlite3.connect(self.tmp.name) as raw:
+            raw.execute(
+                """
+                CREATE TABLE jobs (
+                  job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  channel_id INTEGER NOT NULL,
+                  message_id INTEGER NOT NULL,
+                  title TEXT NOT NULL,
+                  description TEXT NOT NULL,
+                  reward INTEGER NOT NULL,
+                  status TEXT NOT NULL DEFAULT 'open',
+                  created_by INTEGER NOT NULL,
+                  claimed_by INTEGER,
+                  thread_id INTEGER,
+                  created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                  updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+                )
+                """
+            )
+            raw.execute(
+                "INSERT INTO jobs(channel_id, message_id, title, description, reward, created_by) VALUES(1, 1, 't', 'd', 5, 1)"
+            )
+
+        await self.db.connect()
+        self.assertEqual(self._user_version(), SCHEMA_VERSION)
+        self.assertFalse(await self.db.get_job_attendance_lock(1))
+        self.assertIsNone(await self.db.get_job_thread_control_message(1))
+
+    async def test_failed_migration_step_rolls_back_with_its_version(self):
+        legacy = MIGRATIONS[:8]
+        with mock.patch("services.db.MIGRATIONS", legacy), mock.patch("services.db.SCHEMA_VERSION", legacy[-1][0]):
+            await self.db.connect()
+            await self.db.close()
+
+        async def fail_after_ddl(db):
+            await db._execute_script(JOB_ATTENDANCE_SYNC_SCHEMA)
+            raise RuntimeError("crash mid-migration")
+
+        self.db = Database(path=self.tmp.name)
+        with mock.patch.object(Database, "_migration_009_attendance_sync", fail_after_ddl):
+            with self.assertRaises(RuntimeError):
+                await self.db.connect()
+        await self.db.close()
+        self.assertEqual(self._user_version(), 8)
+        with sqlite3.connect(self.tmp.name) as raw:
+            tables = {r[0] for r in raw.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        self.assertNotIn("job_attendance_sync", tables)
+
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.assertEqual(self._user_version(), SCHEMA_VERSION)
+
+    async def test_member_tables_fold_into_members_by_guild(self):
+        legacy = MIGRATIONS[:3]
+        with mock.patch("services.db.MIGRATIONS", legacy), mock.patch("services.db.SCHEMA_VERSION", legacy[-1][0]):
+            await self.db.connect()
+            await self.db.close()
+        with sqlite3.connect(self.tmp.name) as raw:
+            raw.execute("INSERT INTO wallets_by_guild(guild_id, discord_id, balance) VALUES(1, 2, 500)")
+            raw.execute("INSERT INTO shareholdings_by_guild(guild_id, discord_id, shares) VALUES(1, 2, 4)")
+            raw.execute("INSERT INTO shares_escrow_by_guild(guild_id, discord_id, locked_shares) VALUES(1, 2, 1)")
+            raw.execute("INSERT INTO reputation_by_guild(guild_id, discord_id, rep) VALUES(1, 3, 70)")
+
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.assertEqual(self._user_version(), SCHEMA_VERSION)
+        self.assertEqual(await self.db.get_balance(2, guild_id=1), 500)
+        self.assertEqual(await self.db.get_shares_available(2, guild_id=1), 3)
+        self.assertEqual(await self.db.get_rep(3, guild_id=1), 70)
+
+        await self.db.buy_shares(2, shares_delta=1, cost=100, guild_id=1)
+        with sqlite3.connect(self.tmp.name) as raw:
+            members = raw.execute(
+                "SELECT discord_id, balance, shares, locked_shares, rep FROM members_by_guild WHERE guild_id=1 ORDER BY discord_id"
+            ).fetchall()
+            # The old names stay readable and writable through compatibility views.
+            raw.execute("INSERT INTO wallets_by_guild(guild_id, discord_id, balance) VALUES(1, 3, 0)")
+            raw.execute("UPDATE reputation_by_guild SET rep=rep+5 WHERE guild_id=1 AND discord_id=3")
+            view_rep = raw.execute("SELECT rep FROM reputation_by_guild WHERE guild_id=1 AND discord_id=3").fetchone()[0]
+        self.assertEqual(members, [(2, 400, 5, 1, 0), (3, 0, 0, 0, 70)])
+        self.assertEqual(view_rep, 75)
+
+    async def _seed_member_facets(self):
+        legacy = MIGRATIONS[:3]
+        with mock.patch("services.db.MIGRATIONS", legacy), mock.patch("services.db.SCHEMA_VERSION", legacy[-1][0]):
+            await self.db.connect()
+            await self.db.close()
+        with sqlite3.connect(self.tmp.name) as raw:
+            raw.execute("INSERT INTO wallets_by_guild(guild_id, discord_id, balance) VALUES(1, 2, 500)")
+            raw.execute("INSERT INTO shareholdings_by_guild(guild_id, discord_id, shares) VALUES(1, 2, 4)")
+            raw.execute("INSERT INTO reputation_by_guild(guild_id, discord_id, rep) VALUES(1, 3, 70)")
+
+    async def test_member_fold_reruns_after_failure_partway(self):
+        await self._seed_member_facets()
+
+        async def fail_before_views(db):
+            await db._execute_script(MEMBERS_BY_GUILD_SCHEMA)
+            await db.conn.execute("INSERT INTO members_by_guild(guild_id, discord_id, balance) SELECT guild_id, discord_id, balance FROM wallets_by_guild")
+            await db.conn.execute("DROP TABLE wallets_by_guild")
+            raise RuntimeError("crash mid-migration")
+
+        self.db = Database(path=self.tmp.name)
+        with mock.patch.object(Database, "_migration_004_members_by_guild", fail_before_views):
+            with self.assertRaises(RuntimeError):
+                await self.db.connect()
+        await self.db.close()
+        self.assertEqual(self._user_version(), 3)
+
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.assertEqual(self._user_version(), SCHEMA_VERSION)
+        self.assertEqual(await self.db.get_balance(2, guild_id=1), 500)
+        self.assertEqual(await self.db.get_shares_available(2, guild_id=1), 4)
+        self.assertEqual(await self.db.get_rep(3, guild_id=1), 70)
+
+    async def test_member_fold_recovers_facets_dropped_by_an_earlier_crash(self):
+        await self._seed_member_facets()
+        # State left by a crash between the copy and the views when each statement committed alone.
+        with sqlite3.connect(self.tmp.name) as raw:
+            raw.executescript(MEMBERS_BY_GUILD_SCHEMA)
+            raw.execute("INSERT INTO members_by_guild(guild_id, discord_id, balance) SELECT guild_id, discord_id, balance FROM wallets_by_guild")
+            raw.execute("DROP TABLE wallets_by_guild")
+
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.assertEqual(self._user_version(), SCHEMA_VERSION)
+        self.assertEqual(await self.db.get_balance(2, guild_id=1), 500)
+        self.assertEqual(await self.db.get_shares_available(2, guild_id=1), 4)
+        self.assertEqual(await self.db.get_rep(3, guild_id=1), 70)
+        with sqlite3.connect(self.tmp.name) as raw:
+            kinds = dict(raw.execute("SELECT name, type FROM sqlite_master WHERE name LIKE '%_by_guild'").fetchall())
+        self.assertEqual(kinds["wallets_by_guild"], "view")
+        self.assertEqual(kinds["reputation_by_guild"], "view")
+
+    async def test_bond_liability_counters_backfill_from_pending_bonds(self):
+        legacy = MIGRATIONS[:6]
+        with mock.patch("services.db.MIGRATIONS", legacy), mock.patch("services.db.SCHEMA_VERSION", legacy[-1][0]):
+            await self.db.connect()
+            await self.db.close()
+        with sqlite3.connect(self.tmp.name) as raw:
+            raw.executemany(
+                "INSERT INTO payout_bonds(guild_id, user_id, amount_owed, status) VALUES(?,?,?,?)",
+                [(1, 2, 100, "pending"), (1, 2, 40, "pending"), (1, 3, 70, "redeemed"), (4, 3, 5, "pending")],
+            )
+
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.assertEqual(await self.db.get_bond_liability(guild_id=1), (2, 140))
+        self.assertEqual(await self.db.get_user_outstanding_bonds(3, guild_id=4), (1, 5))
+        self.assertEqual(await self.db.get_user_outstanding_bonds(3, guild_id=1), (0, 0))
+
+    async def test_attendance_snapshot_text_moves_to_snapshot_table(self):
+        legacy = MIGRATIONS[:7]
+        with mock.patch("services.db.MIGRATIONS", legacy), mock.patch("services.db.SCHEMA_VERSION", legacy[-1][0]):
+            await self.db.connect()
+            await self.db.close()
+        with sqlite3.connect(self.tmp.name) as raw:
+            job_id = raw.execute(
+                "INSERT INTO jobs(channel_id, message_id, title, description, reward, created_by, category, attendance_snapshot) "
+                "VALUES(1, 1, 'Op', 'desc', 100, 1, 'event', ?)",
+                ("4, 5,x,6",),
+            ).lastrowid
+
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.assertEqual(await self.db.get_job_attendance_snapshot(job_id), [4, 5, 6])
+        self.assertEqual([v for v, _, _ in await self.db.list_job_attendance_snapshots(job_id)], [1])
+        with sqlite3.connect(self.tmp.name) as raw:
+            self.assertIsNone(raw.execute("SELECT attendance_snapshot FROM jobs WHERE job_id=?", (job_id,)).fetchone()[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
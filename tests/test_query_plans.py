@@ -0,0 +1,131 @@
+import os
+import re
+import sqlite3
+import tempfile
+import unittest
+
+from services.db import Database
+
+# Plans like "SCAN jobs" read every row; "SCAN t USING INDEX ..." or "SEARCH ..." do not count.
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+PLANNED_PREFIXES = ("SELECT", "UPDATE", "DELETE", "WITH", "INSERT")
+
+
+class QueryPlanTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-plan-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.statements: list[str] = []
+        for conn in [self.db.conn, *self.db._readers]:
+            await conn.set_trace_callback(self.statements.append)
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def _exercise_hot_paths(self):
+        db, gid = self.db, 1
+        await db.set_guild_setting(gid, "JOBS_CHANNEL_ID", "10")
+        await db.get_guild_settings(gid)
+        await db.set_treasury(1_000_000, updated_by=1, guild_id=gid)
+        await db.add_balance(2, 500_000, "seed", guild_id=gid)
+        await db.buy_shares(2, shares_delta=3, cost=300_000, guild_id=gid)
+        await db.add_rep(2, 50, guild_id=gid)
+        await db.get_shares_available(2, guild_id=gid)
+        await db.get_level(2, guild_id=gid)
+        await db.get_treasury_meta(guild_id=gid)
+        await db.get_account_snapshot(2, guild_id=gid)
+        await db.get_account_snapshot(2)
+        await db.get_ledger_reconcile(guild_id=gid)
+
+        job_id = await db.create_job(1, 1, "Haul", "desc", 200, created_by=1, guild_id=gid)
+        await db.claim_job(job_id, claimed_by=2)
+        await db.set_job_thread(job_id, 99)
+        await db.set_job_thread_control_message(job_id, 100)
+        await db.get_job_thread_control_message(job_id)
+        await db.add_job_crew_member(job_id, 3, added_by=2, guild_id=gid)
+        await db.list_job_crew(job_id, guild_id=gid)
+        await db.complete_job(job_id)
+        await db.settle_job_payout(job_id, [(2, 200), (3, 5_000_000)], confirmed_by=1, guild_id=gid)
+        await db.get_job(job_id, guild_id=gid)
+        await db.get_reserved_job_escrow(guild_id=gid)
+        await db.get_reserved_job_escrow()
+        await db.list_job_ids_by_status(["open", "claimed", "completed", "paid"])
+        await db.list_event_job_cards(["open", "claimed", "completed", "paid"])
+        await db.get_job_min_level(job_id)
+        await db.set_job_card_fingerprint(100, job_id, "abc")
+        await db.get_job_card_fingerprint(100)
+        bulk_job = await db.create_job(1, 3, "Bulk", "desc", 90, created_by=1, guild_id=gid)
+        await db.claim_job(bulk_job, claimed_by=2)
+        await db.complete_job(bulk_job)
+        await db.settle_and_credit_job_payout(bulk_job, [(2, 45), (3, 45)], confirmed_by=1, guild_id=gid, rep_per_target=10)
+
+        event_job = await db.create_job(1, 2, "Op", "desc", 100, created_by=1, category="event", guild_id=gid)
+        await db.link_event_job(555, event_job)
+        await db.get_job_id_by_event(555)
+        await db.add_event_attendee(event_job, 4)
+        await db.remove_event_attendee(event_job, 4)
+        await db.apply_attendance_changes(event_job, [5, 6], [4])
+        await db.get_event_id_by_job(event_job)
+        await db.sync_event_attendance(event_job, [5, 7], event_id=555, subscriber_count=2)
+        await db.is_event_attendance_synced(event_job, 555, [5, 7])
+        await db.list_event_attendees(event_job)
+        await db.set_job_attendance_snapshot(event_job, [4, 5])
+        await db.get_job_attendance_snapshot(event_job)
+        await db.set_job_attendance_snapshot(event_job, [5, 6])
+        await db.diff_job_attendance_snapshots(event_job, 1)
+        await db.list_job_attendance_snapshots(event_job)
+
+        await db.upsert_job_template("Mining", "Mine", "desc", 1, 2, 0, "mining")
+        await db.get_job_template_by_name("mining")
+        await db.set_job_template_active("MINING", False)
+
+        await db.lock_shares(2, 1, guild_id=gid)
+        rid = await db.create_cashout_request(gid, 1, 1, 2, 1)
+        await db.set_cashout_thread(rid, 7, guild_id=gid)
+        await db.set_cashout_status(rid, "approved", handled_by=1, guild_id=gid)
+        await db.get_cashout_request(rid, guild_id=gid)
+        await db.finalize_cashout_paid(rid, 100_000, handled_by=1, guild_id=gid)
+        await db.count_cashout_requests(["pending"], guild_id=gid)
+        await db.count_cashout_requests(["pending"])
+        await db.list_cashout_requests(["pending", "approved"], guild_id=gid)
+        await db.count_user_cashout_requests(2, ["pending", "approved"], guild_id=gid)
+
+        await db.list_transactions(types=["payout", "rep"], guild_id=gid)
+        await db.list_transactions(discord_id=2, guild_id=gid)
+        await db.list_transactions(discord_id=2, guild_id=gid, include_archive=True)
+        await db.archive_cold_rows(older_than_days=90)
+        await db.list_pending_bonds(3, guild_id=gid)
+        await db.get_total_outstanding_bonds(guild_id=gid)
+        await db.get_user_outstanding_bonds(3, guild_id=gid)
+        await db.redeem_bonds_for_user(3, guild_id=gid, redeemed_by=1)
+        await db.get_total_stocks(guild_id=gid)
+        await db.get_stock_change_bps(7, guild_id=gid)
+        await db.list_stock_candles(gid, 3600, 0)
+        await db.flush()
+
+    async def test_hot_paths_do_not_full_scan(self):
+        await self._exercise_hot_paths()
+
+        offenders = []
+        with sqlite3.connect(self.tmp.name) as raw:
+            for sql in dict.fromkeys(self.statements):
+                if not sql.lstrip().upper().startswith(PLANNED_PREFIXES):
+                    continue
+                for row in raw.execute(f"EXPLAIN QUERY PLAN {sql}"):
+                    if FULL_SCAN.match(str(row[3])):
+                        offenders.append(f"{row[3]}: {' '.join(sql.split())}")
+
+        self.assertEqual(offenders, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
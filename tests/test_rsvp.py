@@ -0,0 +1,111 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from services.db import Database
+from services.rsvp import RsvpAggregator
+
+
+class RsvpAggregatorTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-rsvp-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.job_id = await self.db.create_job(1, 1, "Op", "desc", 100, created_by=1, category="event", guild_id=1)
+        await self.db.link_event_job(555, self.job_id)
+        self.refreshed: list[int] = []
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def _refresh(self, job_id: int):
+        self.refreshed.append(int(job_id))
+
+    async def _attendees(self) -> list[int]:
+        return sorted(int(r[0]) for r in await self.db.list_event_attendees(self.job_id))
+
+    async def test_event_job_cache_follows_links_and_survives_reconnect(self):
+        self.assertEqual(await self.db.get_job_id_by_event(555), self.job_id)
+        await self.db.link_event_job(556, self.job_id)
+        self.assertIsNone(await self.db.get_job_id_by_event(555))
+        self.assertEqual(await self.db.get_job_id_by_event(556), self.job_id)
+
+        await self.db.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.assertEqual(await self.db.get_job_id_by_event(556), self.job_id)
+        self.assertIsNone(await self.db.get_job_id_by_event(555))
+
+    async def test_burst_is_written_once_with_last_change_winning(self):
+        rsvps = RsvpAggregator(self.db, self._refresh, flush_ms=10, refresh_s=60)
+        await self.db.add_event_attendee(self.job_id, 9)
+        for uid in range(100, 300):
+            self.assertTrue(await rsvps.submit(555, uid, joined=True))
+        await rsvps.submit(555, 150, joined=False)
+        await rsvps.submit(555, 9, joined=False)
+        self.assertFalse(await rsvps.submit(999, 1, joined=True))
+        await asyncio.sleep(0.1)
+
+        attendees = await self._attendees()
+        self.assertEqual(len(attendees), 199)
+        self.assertNotIn(150, attendees)
+        self.assertNotIn(9, attendees)
+        self.assertEqual(self.refreshed, [self.job_id])
+
+        # A second burst inside the refresh interval is written but its refresh is deferred.
+        await rsvps.submit(555, 150, joined=True)
+        await asyncio.sleep(0.05)
+        self.assertIn(150, await self._attendees())
+        self.assertEqual(self.refreshed, [self.job_id])
+        self.assertIn(self.job_id, rsvps._refresh_tasks)
+        await rsvps.close()
+        self.assertEqual(rsvps._refresh_tasks, {})
+
+    async def test_failed_flush_requeues_without_overriding_newer_rsvps(self):
+        rsvps = RsvpAggregator(self.db, self._refresh, flush_ms=60_000, refresh_s=0)
+        apply = self.db.apply_attendance_changes
+        calls = []
+
+        async def flaky(job_id, added, removed):
+            calls.append((sorted(added), sorted(removed)))
+            if len(calls) == 1:
+                # A newer RSVP lands while the failing write is in flight.
+                await rsvps.submit(555, 7, joined=False)
+                raise RuntimeError("database is locked")
+            return await apply(job_id, added, removed)
+
+        await rsvps.submit(555, 7, joined=True)
+        await rsvps.submit(555, 8, joined=True)
+        with mock.patch.object(self.db, "apply_attendance_changes", flaky), self.assertLogs("services.rsvp", level="ERROR"):
+            self.assertIsNone(await rsvps.flush(self.job_id))
+            self.assertIn(self.job_id, rsvps._tasks)
+            await rsvps.close()
+
+        self.assertEqual(calls, [([7, 8], []), ([8], [7])])
+        self.assertEqual(await self._attendees(), [8])
+        self.assertEqual(rsvps._tasks, {})
+
+    async def test_locked_attendance_ignores_batch(self):
+        await self.db.set_job_attendance_lock(self.job_id, True)
+        rsvps = RsvpAggregator(self.db, self._refresh, flush_ms=60_000, refresh_s=0)
+        await rsvps.submit(555, 7, joined=True)
+        await rsvps.close()
+
+        self.assertEqual(await self._attendees(), [])
+        self.assertEqual(self.refreshed, [])
+        result = await self.db.apply_attendance_changes(self.job_id, [7], [])
+        self.assertEqual(result, {"locked": True, "added": 0, "removed": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
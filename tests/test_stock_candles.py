@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from services.db import MIGRATIONS, Database
+from services.market import fold_candles
+
+
+class FoldCandlesTests(unittest.TestCase):
+    def test_points_fold_into_ohlc_per_resolution(self):
+        base = 1_700_000_000 // 86400 * 86400
+        points = [(100, "", base + 5), (120, "", base + 30), (90, "", base + 61), (95, "", base + 3_700)]
+        rows = {(r[0], r[1]): r[2:] for r in fold_candles(points)}
+        self.assertEqual(rows[(60, base)], (100, 120, 100, 120, 2))
+        self.assertEqual(rows[(60, base + 60)], (90, 90, 90, 90, 1))
+        self.assertEqual(rows[(3600, base)], (100, 120, 90, 90, 3))
+        self.assertEqual(rows[(3600, base + 3600)], (95, 95, 95, 95, 1))
+        self.assertEqual(rows[(86400, base)], (100, 120, 90, 95, 4))
+
+
+class StockCandleTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-candles-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    def _candles(self, gid: int, res: int):
+        with sqlite3.connect(self.tmp.name) as raw:
+            return raw.execute(
+                "SELECT open, high, low, close, samples FROM stock_candles WHERE guild_id=? AND resolution=? ORDER BY bucket_start",
+                (gid, res),
+            ).fetchall()
+
+    async def test_flush_rolls_prices_into_candles(self):
+        await self.db.connect()
+        with mock.patch("services.market.MARKET_FLUSH_MS", 60_000):
+            for price in (101_000, 103_000, 99_000, 100_500):
+                await self.db.set_stock_price_state(guild_id=1, current_price=price)
+            await self.db.market.flush()
+            await self.db.set_stock_price_state(guild_id=1, current_price=98_000)
+            await self.db.market.flush()
+        daily = self._candles(1, 86400)
+        self.assertEqual(daily, [(101_000, 103_000, 98_000, 98_000, 5)])
+
+    async def test_change_bps_reads_reference_from_candles(self):
+        await self.db.connect()
+        await self.db.set_stock_price_state(guild_id=2, current_price=110_000)
+        await self.db.market.flush()
+        week_ago = (int(time.time()) - 7 * 86400) // 3600 * 3600
+        with sqlite3.connect(self.tmp.name) as raw:
+            raw.execute("DELETE FROM stock_candles WHERE guild_id=2")
+            raw.execute(
+                "INSERT INTO stock_candles VALUES(2, 3600, ?, 100000, 100000, 100000, 100000, 1)",
+                (week_ago + 3600,),
+            )
+            raw.execute(
+                "INSERT INTO stock_candles VALUES(2, 3600, ?, 50000, 50000, 50000, 50000, 1)",
+                (week_ago - 3600,),
+            )
+        self.assertEqual(await self.db.get_stock_change_bps(7, guild_id=2), 1000)
+
+    async def test_change_bps_uses_unflushed_prices_without_writing(self):
+        await self.db.connect()
+        with mock.patch("services.market.MARKET_FLUSH_MS", 60_000):
+            await self.db.set_stock_price_state(guild_id=3, current_price=100_000)
+            await self.db.set_stock_price_state(guild_id=3, current_price=105_000)
+            changes_before = self.db.conn.total_changes
+            self.assertEqual(await self.db.get_stock_change_bps(1, guild_id=3), 500)
+            self.assertEqual(self.db.conn.total_changes, changes_before)
+        with sqlite3.connect(self.tmp.name) as raw:
+            self.assertEqual(raw.execute("SELECT COUNT(*) FROM stock_candles WHERE guild_id=3").fetchone()[0], 0)
+
+    async def test_migration_backfills_candles_from_history(self):
+        legacy = MIGRATIONS[:4]
+        with mock.patch("services.db.MIGRATIONS", legacy), mock.patch("services.db.SCHEMA_VERSION", legacy[-1][0]):
+            await self.db.connect()
+            await self.db.close()
+        with sqlite3.connect(self.tmp.name) as raw:
+            raw.executemany(
+                "INSERT INTO stock_price_history(guild_id, price, created_at) VALUES(3, ?, ?)",
+                [(100, "2024-01-01 10:00:05"), (130, "2024-01-01 10:20:00"), (80, "2024-01-01 11:00:00"), (90, "2024-01-02 00:00:00")],
+            )
+
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        self.assertEqual(self._candles(3, 3600), [(100, 130, 100, 130, 2), (80, 80, 80, 80, 1), (90, 90, 90, 90, 1)])
+        self.assertEqual(self._candles(3, 86400), [(100, 130, 80, 80, 3), (90, 90, 90, 90, 1)])
+        self.assertEqual(self._candles(3, 60), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from services.db import Database
+from services.market import TradeFlowWindow
+
+
+class TradeFlowWindowTests(unittest.TestCase):
+    def test_totals_slide_with_the_clock(self):
+        flow = TradeFlowWindow(size=10)
+        flow.add(100, buys=5)
+        flow.add(103, sells=2)
+        flow.add(103, buys=1)
+        self.assertEqual((flow.buys_total, flow.sells_total, flow.net_total), (6, 2, 4))
+        flow.advance(109)
+        self.assertEqual(flow.net_total, 4)
+        flow.advance(110)
+        self.assertEqual((flow.buys_total, flow.sells_total), (1, 2))
+        flow.advance(500)
+        self.assertEqual((flow.buys_total, flow.sells_total), (0, 0))
+
+    def test_buckets_older_than_window_are_ignored(self):
+        flow = TradeFlowWindow(size=10)
+        flow.advance(200)
+        flow.add(150, buys=9)
+        self.assertEqual(flow.buys_total, 0)
+        self.assertIsNone(flow.bucket(150))
+
+
+class TradeFlowPersistenceTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-flow-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def test_window_survives_restart_and_expires(self):
+        now = 1_800_000_000
+        with mock.patch("services.market.time.time", return_value=now):
+            await self.db.record_stock_trade_metrics("buy", 300, guild_id=1)
+            await self.db.record_stock_trade_metrics("sell", 100, guild_id=1)
+            await self.db.close()
+
+            self.db = Database(path=self.tmp.name)
+            await self.db.connect()
+            metrics = await self.db.get_stock_trade_metrics(guild_id=1)
+        self.assertEqual((metrics["buys_units_24h"], metrics["sells_units_24h"], metrics["net_units_24h"]), (300, 100, 200))
+
+        with mock.patch("services.market.time.time", return_value=now + 86400):
+            metrics = await self.db.get_stock_trade_metrics(guild_id=1)
+            self.assertEqual(metrics["net_units_24h"], 0)
+            await self.db.record_stock_trade_metrics("buy", 7, guild_id=1)
+            await self.db.market.flush()
+        with sqlite3.connect(self.tmp.name) as raw:
+            rows = raw.execute("SELECT minute, buys, sells FROM stock_trade_flow WHERE guild_id=1").fetchall()
+            stored = raw.execute("SELECT net_units_24h FROM stock_trade_metrics WHERE guild_id=1").fetchone()
+        self.assertEqual(rows, [((now + 86400) // 60, 7, 0)])
+        self.assertEqual(stored, (7,))
+
+    async def test_reprice_uses_window_flow(self):
+        now = 1_800_000_000
+        with mock.patch("services.market.time.time", return_value=now):
+            await self.db.record_stock_trade_metrics("buy", 200, guild_id=2)
+        with mock.patch("services.market.time.time", return_value=now + 86400):
+            before, after, bps = await self.db.market.reprice(2)
+        self.assertEqual(bps, 0)
+        self.assertEqual(before, after)
+
+
+if __name__ == "__main__":
+    unittest.main()
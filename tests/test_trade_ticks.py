@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from services.db import Database
+
+
+class TradeTickTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.NamedTemporaryFile(prefix="orgbot-ticks-test-", suffix=".db", delete=False)
+        self.tmp.close()
+        self.db = Database(path=self.tmp.name)
+        await self.db.connect()
+        await self.db.set_stock_price_state(guild_id=1, current_price=1_000)
+        for uid, balance in ((10, 50_000), (11, 50_000), (12, 2_500)):
+            await self.db.conn.execute(
+                "INSERT INTO members_by_guild(guild_id, discord_id, balance, shares) VALUES(1, ?, ?, 20)",
+                (uid, balance),
+            )
+        await self.db.conn.commit()
+
+    async def asyncTearDown(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(self.tmp.name)
+        except Exception:
+            pass
+
+    async def test_tick_settles_all_intents_at_one_price(self):
+        with mock.patch("services.trade_ticks.TRADE_TICK_MS", 20), mock.patch.object(
+            self.db.market, "reprice", wraps=self.db.market.reprice
+        ) as reprice:
+            fills = await asyncio.gather(
+                self.db.trades.submit(10, "buy", 10, guild_id=1),
+                self.db.trades.submit(11, "buy", 5, guild_id=1),
+                self.db.trades.submit(12, "buy", 2, guild_id=1),
+                self.db.trades.submit(12, "buy", 1, guild_id=1),
+                self.db.trades.submit(11, "sell", 15, guild_id=1),
+            )
+        self.assertEqual({f.price for f in fills}, {1_000})
+        self.assertEqual([f.ok for f in fills], [True, True, True, False, True])
+        self.assertEqual(fills[3].error, "Not enough Org Credits to buy stocks.")
+        self.assertEqual(reprice.await_count, 1)
+
+        self.assertEqual(await self.db.get_balance(10, guild_id=1), 40_000)
+        self.assertEqual(await self.db.get_balance(12, guild_id=1), 500)
+        self.assertEqual(await self.db.get_shares(11, guild_id=1), 25)
+        self.assertEqual(await self.db.get_shares_locked(11, guild_id=1), 15)
+        metrics = await self.db.get_stock_trade_metrics(guild_id=1)
+        self.assertEqual((metrics["buys_units_24h"], metrics["sells_units_24h"]), (17, 15))
+        with sqlite3.connect(self.tmp.name) as raw:
+            (buys,) = raw.execute("SELECT COUNT(*) FROM transactions WHERE type='buy_shares' AND guild_id=1").fetchone()
+        self.assertEqual(buys, 3)
+
+    async def test_close_settles_queued_intents(self):
+        with mock.patch("services.trade_ticks.TRADE_TICK_MS", 60_000):
+            pending = asyncio.ensure_future(self.db.trades.submit(10, "buy", 1, guild_id=1))
+            await asyncio.sleep(0)
+            await self.db.trades.close()
+            fill = await pending
+        self.assertTrue(fill.ok)
+        self.assertEqual(await self.db.get_balance(10, guild_id=1), 49_000)
+
+
+    async def test_market_update_failure_still_returns_committed_fills(self):
+        with mock.patch("services.trade_ticks.TRADE_TICK_MS", 0), mock.patch.object(
+            self.db.market, "reprice", side_effect=RuntimeError("reprice failed")
+        ), self.assertLogs("services.trade_ticks", level="ERROR"):
+            fill = await self.db.trades.submit(10, "buy", 2, guild_id=1)
+        self.assertTrue(fill.ok)
+        self.assertEqual(await self.db.get_balance(10, guild_id=1), 48_000)
+
+
+if __name__ == "__main__":
+    unittest.main()